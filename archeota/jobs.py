@@ -0,0 +1,44 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from django.db import close_old_connections, connection
+from archeota import settings
+
+
+class BackgroundJobs():
+    """
+    Process-local worker pool for work that must not run inside a request.
+
+    Every job runs with its own DB connection, which is closed when the job
+    ends. With ``BACKGROUND_JOBS_EAGER`` the job runs inline instead.
+    """
+    _executor: ThreadPoolExecutor | None = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def executor(cls) -> ThreadPoolExecutor:
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=settings.BACKGROUND_JOB_WORKERS,
+                    thread_name_prefix='archeota-job'
+                )
+            return cls._executor
+
+    @staticmethod
+    def run(fn, *args, **kwargs):
+        close_old_connections()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            connection.close()
+
+    @classmethod
+    def submit(cls, fn, *args, **kwargs) -> Future:
+        if settings.BACKGROUND_JOBS_EAGER:
+            future = Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return cls.executor().submit(cls.run, fn, *args, **kwargs)
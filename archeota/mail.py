@@ -0,0 +1,72 @@
+import threading
+import time
+from typing import NamedTuple
+from django.core.mail import EmailMessage, get_connection
+from archeota import settings
+
+
+class MailResult(NamedTuple):
+    message: EmailMessage
+    sent: bool
+    attempts: int
+    error: str | None = None
+
+
+class MailDispatcher():
+    """
+    Sends many messages over a single email backend connection.
+
+    The connection (one SMTP/TLS session with the smtp backend) is opened
+    on the first send and reused for every message. A failed message is
+    retried on a fresh connection up to ``MAIL_RETRIES`` times and every
+    message gets its own ``MailResult``. Safe to share between threads.
+    """
+    def __init__(self, connection=None, retries: int | None = None, backoff: float | None = None):
+        self.connection = connection or get_connection(fail_silently=False)
+        self.retries = settings.MAIL_RETRIES if retries is None else retries
+        self.backoff = settings.MAIL_RETRY_BACKOFF if backoff is None else backoff
+        self._lock = threading.Lock()
+        self._opened = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._opened:
+                try:
+                    self.connection.close()
+                finally:
+                    self._opened = False
+
+    def __reconnect(self):
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+        self.connection.open()
+        self._opened = True
+
+    def send(self, message: EmailMessage) -> MailResult:
+        error = None
+        for attempt in range(1, self.retries + 2):
+            with self._lock:
+                try:
+                    if attempt > 1 or not self._opened:
+                        self.__reconnect()
+                    message.connection = self.connection
+                    self.connection.send_messages([message])
+                    return MailResult(message, True, attempt)
+                except Exception as e:
+                    error = str(e)
+            if attempt <= self.retries and self.backoff:
+                time.sleep(self.backoff * attempt)
+        return MailResult(message, False, self.retries + 1, error)
+
+    @classmethod
+    def send_one(cls, message: EmailMessage) -> MailResult:
+        with cls() as dispatcher:
+            return dispatcher.send(message)
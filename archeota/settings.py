@@ -187,6 +187,8 @@ EMAIL_USE_SSL = config("EMAIL_USE_SSL", cast=bool, default=False)
 
 ADMIN_USER_NAME=config("ADMIN_USER_NAME", default="Admin user")
 ADMIN_USER_EMAIL=config("ADMIN_USER_EMAIL", default=None)
+MAIL_RETRIES = config("MAIL_RETRIES", cast=int, default=2)
+MAIL_RETRY_BACKOFF = config("MAIL_RETRY_BACKOFF", cast=float, default=1.0)
 
 # djangorestframework
 REST_FRAMEWORK = {
@@ -243,3 +245,64 @@ REST_AUTH = {
 GOOGLE_OAUTH_CLIENT_ID = os.getenv("GOOGLE_OAUTH_CLIENT_ID")
 
 SITE_URL = config("SITE_URL", default=None)
+
+# Caches; claim previews and holdings versions are shared by the workers of one host
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "claim_preview": {
+        "BACKEND": config("CLAIM_PREVIEW_CACHE_BACKEND", default="django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": config("CLAIM_PREVIEW_CACHE_LOCATION", default="/var/tmp/archeota_claim_preview"),
+    },
+}
+
+# Background jobs
+BACKGROUND_JOB_WORKERS = config("BACKGROUND_JOB_WORKERS", cast=int, default=2)
+BACKGROUND_JOBS_EAGER = config("BACKGROUND_JOBS_EAGER", cast=bool, default=False)
+# Seconds without progress after which a RUNNING job is taken as abandoned
+JOB_STALE_AFTER = config("JOB_STALE_AFTER", cast=int, default=30 * 60)
+
+# Transaction imports
+IMPORT_SPILL_THRESHOLD = config("IMPORT_SPILL_THRESHOLD", cast=int, default=32 * 1024 * 1024)
+IMPORT_VECTORIZED_MIN_ROWS = config("IMPORT_VECTORIZED_MIN_ROWS", cast=int, default=5000)
+HOLDINGS_WORKERS = config("HOLDINGS_WORKERS", cast=int, default=1)
+
+# Claim delivery
+CLAIM_DELIVERY_WORKERS = config("CLAIM_DELIVERY_WORKERS", cast=int, default=4)
+CLAIM_RENDER_BATCH = config("CLAIM_RENDER_BATCH", cast=int, default=8)
+CLAIM_CHUNK_SIZE = config("CLAIM_CHUNK_SIZE", cast=int, default=2000)
+CLAIM_PREVIEW_CACHE_TIMEOUT = config("CLAIM_PREVIEW_CACHE_TIMEOUT", cast=int, default=15 * 60)
+
+# Claim reports
+# Cached report PDFs contain client data: they are stored outside MEDIA_ROOT
+# (never served) and deleted REPORT_CACHE_TTL seconds after being rendered.
+REPORT_CACHE_ENABLED = config("REPORT_CACHE_ENABLED", cast=bool, default=True)
+REPORT_CACHE_ROOT = config("REPORT_CACHE_ROOT", default=str(BASE_DIR / "private" / "report-cache"))
+REPORT_CACHE_MAX_BYTES = config("REPORT_CACHE_MAX_BYTES", cast=int, default=256 * 1024 * 1024)
+REPORT_CACHE_SCAN_EVERY = config("REPORT_CACHE_SCAN_EVERY", cast=int, default=500)
+REPORT_CACHE_TTL = config("REPORT_CACHE_TTL", cast=int, default=7 * 24 * 60 * 60)
+STORAGES["report_cache"] = {
+    "BACKEND": "django.core.files.storage.FileSystemStorage",
+    "OPTIONS": {"location": REPORT_CACHE_ROOT},
+}
+
+# Chat agent
+AGENT_API_URL = config("AGENT_API_URL", default=None)
+AGENT_TIMEOUT = config("AGENT_TIMEOUT", cast=float, default=20)
+AGENT_CONNECT_TIMEOUT = config("AGENT_CONNECT_TIMEOUT", cast=float, default=5)
+AGENT_POOL_SIZE = config("AGENT_POOL_SIZE", cast=int, default=20)
+AGENT_POOL_TIMEOUT = config("AGENT_POOL_TIMEOUT", cast=float, default=10)
+AGENT_RETRIES = config("AGENT_RETRIES", cast=int, default=2)
+AGENT_RETRY_BACKOFF = config("AGENT_RETRY_BACKOFF", cast=float, default=0.5)
+
+# Chat answer cache
+CHAT_ANSWER_CACHE_BACKEND = config("CHAT_ANSWER_CACHE_BACKEND", default="chat.services.answer_cache.LocalAnswerCache")
+CHAT_ANSWER_CACHE_ALIAS = config("CHAT_ANSWER_CACHE_ALIAS", default="default")
+CHAT_ANSWER_CACHE_TIMEOUT = config("CHAT_ANSWER_CACHE_TIMEOUT", cast=int, default=60 * 60)
+CHAT_ANSWER_CACHE_MAX_ENTRIES = config("CHAT_ANSWER_CACHE_MAX_ENTRIES", cast=int, default=1000)
+CHAT_ANSWER_CACHE_SESSION_SCOPED = config("CHAT_ANSWER_CACHE_SESSION_SCOPED", cast=bool, default=True)
+
+# Chat interaction logs
+CHAT_LOG_DEFERRED = config("CHAT_LOG_DEFERRED", cast=bool, default=True)
+CHAT_LOG_BATCH_SIZE = config("CHAT_LOG_BATCH_SIZE", cast=int, default=100)
@@ -4,10 +4,10 @@ from .models import AgentInteractionLog, ChatSession
 
 @admin.register(ChatSession)
 class ChatSessionAdmin(admin.ModelAdmin):
-    list_display = ('session_id', 'user_email', 'start_time', 'last_activity', 'title_shortened')
+    list_display = ('session_id', 'user_email', 'start_time', 'last_activity', 'title_shortened', 'interaction_count')
     list_filter = ('user', 'start_time', 'last_activity')
     search_fields = ('session_id', 'user__email', 'title')
-    readonly_fields = ('session_id', 'start_time', 'last_activity')
+    readonly_fields = ('session_id', 'start_time', 'last_activity', 'interaction_count')
 
     def user_email(self, obj):
         return obj.user.email
@@ -23,10 +23,10 @@ class ChatSessionAdmin(admin.ModelAdmin):
 @admin.register(AgentInteractionLog)
 class AgentInteractionLogAdmin(admin.ModelAdmin):
     # Actualiza para reflejar la relación con ChatSession
-    list_display = ('get_session_id', 'get_user_email_from_session', 'question_text_shortened', 'answer_text_shortened', 'timestamp', 'is_successful')
-    list_filter = ('timestamp', 'is_successful', 'chat_session__user')
+    list_display = ('get_session_id', 'get_user_email_from_session', 'question_text_shortened', 'answer_text_shortened', 'timestamp', 'is_successful', 'cache_hit')
+    list_filter = ('timestamp', 'is_successful', 'cache_hit', 'chat_session__user')
     search_fields = ('question_text', 'answer_text', 'chat_session__session_id', 'chat_session__user__email')
-    readonly_fields = ('timestamp', 'chat_session', 'question_text', 'answer_text', 'is_successful', 'error_message')
+    readonly_fields = ('timestamp', 'chat_session', 'question_text', 'answer_text', 'is_successful', 'error_message', 'cache_hit')
 
     def get_session_id(self, obj):
         return obj.chat_session.session_id
@@ -0,0 +1,63 @@
+import json
+import time
+from django.core.management.base import BaseCommand
+from chat.services.parser import AnswerStream, _validator, clean, extract_json, parse_body
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the agent output parser on representative bodies: the full "
+        "parse_body path, JSON extraction, schema cleaning (with the full "
+        "jsonschema validation for comparison) and the streamed answer decoder."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=2000, help='Executions per measurement')
+        parser.add_argument('--answer-size', type=int, default=800, help='Characters of general_response')
+        parser.add_argument('--chunk-size', type=int, default=64, help='Characters per piece fed to the stream decoder')
+
+    def __payload(self, options) -> dict:
+        return {
+            'general_response': ('Lorem "ipsum" {dolor} sit amet ñandú. ' * (options['answer_size'] // 38 + 1))[:options['answer_size']],
+            'summary': 'Short summary of the answer.',
+            'additional_questions': [{'question': f'Follow up {i}?'} for i in range(3)],
+            'extra_questions': [{'question': 'Anything else?'}],
+            'category': 'Art',
+            'attributes': ['Artist|Monet', 'Year|1872', 'Note|a|b'],
+        }
+
+    def __bodies(self, payload: dict) -> dict[str, str]:
+        agent_json = json.dumps(payload)
+        invalid = json.dumps({**payload, 'category': 5, 'additional_questions': ['x']})
+        return {
+            'fenced': json.dumps({'output': f"```json\n{agent_json}\n```"}),
+            'prose around': json.dumps({'output': f"Here you go:\n{agent_json}\nAnything else?"}),
+            'object output': json.dumps({'output': payload}),
+            'invalid fields': json.dumps({'output': invalid}),
+            'plain text': 'The agent answered without JSON. ' * 20,
+        }
+
+    def __time(self, name: str, fn, repeat: int):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        elapsed = (time.perf_counter() - started) * 1_000_000 / repeat
+        self.stdout.write(f"  {name}: {elapsed:.1f} us")
+
+    def __stream(self, body: str, chunk_size: int):
+        stream = AnswerStream()
+        for i in range(0, len(body), chunk_size):
+            stream.feed(body[i:i + chunk_size])
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        payload = self.__payload(options)
+        for name, body in self.__bodies(payload).items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name} ({len(body)} chars)"))
+            self.__time('parse_body', lambda: parse_body(body), repeat)
+            self.__time('stream decoder', lambda: self.__stream(body, options['chunk_size']), repeat)
+        self.stdout.write(self.style.MIGRATE_HEADING('schema check'))
+        text = f"```json\n{json.dumps(payload)}\n```"
+        self.__time('extract_json', lambda: extract_json(text), repeat)
+        self.__time('clean', lambda: clean(payload), repeat)
+        self.__time('jsonschema is_valid', lambda: _validator.is_valid(payload), repeat)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0013_alter_chatsession_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentinteractionlog',
+            name='cache_hit',
+            field=models.BooleanField(default=False, verbose_name='respuesta desde caché'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0014_agentinteractionlog_cache_hit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='interaction_count',
+            field=models.PositiveIntegerField(default=0, help_text='Questions received in this session, whether or not their interaction log was saved', verbose_name='Questions asked'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-17 10:31
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def merge_duplicate_sessions(apps, schema_editor):
+    """
+    Sessions sharing a ``session_id`` (two first questions racing) are
+    merged into the oldest one: its interactions move over, it keeps the
+    first known user and the latest activity.
+    """
+    ChatSession = apps.get_model('chat', 'ChatSession')
+    AgentInteractionLog = apps.get_model('chat', 'AgentInteractionLog')
+    duplicated = (ChatSession.objects
+                  .values('session_id')
+                  .annotate(total=Count('id'))
+                  .filter(total__gt=1)
+                  .values_list('session_id', flat=True))
+    for session_id in list(duplicated):
+        sessions = list(ChatSession.objects.filter(session_id=session_id).order_by('start_time', 'id'))
+        keeper, others = sessions[0], sessions[1:]
+        AgentInteractionLog.objects.filter(chat_session__in=others).update(chat_session=keeper)
+        if keeper.user_id is None:
+            keeper.user_id = next((s.user_id for s in others if s.user_id is not None), None)
+        keeper.last_activity = max(s.last_activity for s in sessions)
+        ChatSession.objects.filter(pk=keeper.pk).update(user_id=keeper.user_id, last_activity=keeper.last_activity)
+        ChatSession.objects.filter(pk__in=[s.pk for s in others]).delete()
+
+
+def count_interactions(apps, schema_editor):
+    ChatSession = apps.get_model('chat', 'ChatSession')
+    AgentInteractionLog = apps.get_model('chat', 'AgentInteractionLog')
+    counts = (AgentInteractionLog.objects
+              .filter(chat_session=OuterRef('pk'))
+              .order_by()
+              .values('chat_session')
+              .annotate(total=Count('id'))
+              .values('total'))
+    ChatSession.objects.update(interaction_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0015_chatsession_interaction_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_sessions, migrations.RunPython.noop),
+        migrations.RunPython(count_interactions, migrations.RunPython.noop),
+    ]
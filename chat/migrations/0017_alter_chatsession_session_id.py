@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 10:32
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0016_dedupe_sessions_backfill_interaction_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chatsession',
+            name='session_id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name='Session ID'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0017_alter_chatsession_session_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='unsent_question',
+            field=models.TextField(blank=True, help_text='First question answered from the shared answer cache, sent to the agent before the next one', null=True, verbose_name='Unsent question'),
+        ),
+    ]
@@ -8,7 +8,7 @@ USER_MODEL = get_user_model()
 class ChatSession(models.Model):
     session_id = models.UUIDField(default=uuid.uuid4, 
                                   editable=False, 
-                                  db_index=True, 
+                                  unique=True, 
                                   verbose_name='Session ID')
     user = models.ForeignKey(USER_MODEL, 
                              on_delete=models.CASCADE, 
@@ -20,6 +20,20 @@ class ChatSession(models.Model):
                                       verbose_name='Begin Session')
     last_activity = models.DateTimeField(auto_now=True, verbose_name='Last Activity')
     title = models.CharField(max_length=255, blank=True, null=True, verbose_name='Title')
+    # Counted when the question is received, so it also includes questions
+    # whose log row could not be saved. Sessions older than migration 0016
+    # were backfilled from their logs.
+    interaction_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Questions asked',
+        help_text="Questions received in this session, whether or not their interaction log was saved"
+    )
+    unsent_question = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='Unsent question',
+        help_text="First question answered from the shared answer cache, sent to the agent before the next one"
+    )
 
     def __str__(self) -> str:
         user_email = self.user.email if self.user else "Anonymous"
@@ -46,6 +60,7 @@ class AgentInteractionLog(models.Model):
     timestamp = models.DateTimeField(default=timezone.now, verbose_name='fecha y hora')
     is_successful = models.BooleanField(default=False, verbose_name='interacción exitosa')
     error_message = models.TextField(blank=True, null=True, verbose_name='mensaje de error (si hubo)')
+    cache_hit = models.BooleanField(default=False, verbose_name='respuesta desde caché')
 
     def __str__(self):
         user_email = self.chat_session.user.email if self.chat_session and self.chat_session.user else "N/A"
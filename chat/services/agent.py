@@ -0,0 +1,101 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import EmptyPoolError
+from urllib3.util.retry import Retry
+from archeota import settings
+
+
+class _BoundedPoolMixin():
+    pool_timeout: float | None = None
+
+    def _get_conn(self, timeout=None):
+        return super()._get_conn(self.pool_timeout if timeout is None else timeout)
+
+
+class BoundedPoolAdapter(HTTPAdapter):
+    """
+    ``HTTPAdapter`` whose pool blocks when every connection is taken, but
+    only for ``pool_timeout`` seconds; after that the request fails with a
+    ``ConnectionError`` instead of waiting for a connection forever.
+    """
+    def __init__(self, pool_timeout: float, **kwargs):
+        self.pool_timeout = pool_timeout
+        super().__init__(pool_block=True, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: type(pool.__name__, (_BoundedPoolMixin, pool), {'pool_timeout': self.pool_timeout})
+            for scheme, pool in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+    def send(self, request, *args, **kwargs):
+        try:
+            return super().send(request, *args, **kwargs)
+        except EmptyPoolError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+
+
+class AgentClient():
+    """
+    Keep-alive HTTP client for the agent API.
+
+    A single ``requests.Session`` per process keeps a bounded pool of
+    connections to the agent, so questions reuse open TCP/TLS connections.
+    A request waits at most ``AGENT_POOL_TIMEOUT`` seconds for a free
+    connection. Connection failures and 502/503 answers are retried with
+    exponential backoff; read timeouts and 504 are not, since the agent may
+    still be working on the question.
+    """
+    _default = None
+    _lock = threading.Lock()
+
+    def __init__(self, url: str | None = None, timeout: float | None = None, pool_size: int | None = None,
+                 retries: int | None = None, backoff: float | None = None, pool_timeout: float | None = None):
+        self.url = url or settings.AGENT_API_URL
+        self.timeout = (settings.AGENT_CONNECT_TIMEOUT, timeout or settings.AGENT_TIMEOUT)
+        retry = Retry(
+            total=settings.AGENT_RETRIES if retries is None else retries,
+            read=0,
+            backoff_factor=settings.AGENT_RETRY_BACKOFF if backoff is None else backoff,
+            status_forcelist=(502, 503),
+            allowed_methods=frozenset({'GET'}),
+            raise_on_status=False
+        )
+        pool_size = pool_size or settings.AGENT_POOL_SIZE
+        adapter = BoundedPoolAdapter(
+            settings.AGENT_POOL_TIMEOUT if pool_timeout is None else pool_timeout,
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @classmethod
+    def default(cls) -> "AgentClient":
+        with cls._lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def ask(self, session_id: str, question: str, stream: bool = False) -> requests.Response:
+        return self.session.get(
+            self.url,
+            params={'sesionid': session_id, 'question': question},
+            timeout=self.timeout,
+            stream=stream
+        )
+
+    def stream(self, session_id: str, question: str) -> requests.Response:
+        """
+        Same request as ``ask`` but the body is left on the wire to be read
+        as it arrives. The connection goes back to the pool once the body
+        is consumed or the response is closed.
+        """
+        return self.ask(session_id, question, stream=True)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,125 @@
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from archeota import settings
+
+
+_SPACES = re.compile(r"\s+")
+_EDGE_PUNCTUATION = "¿?¡!.,;: \"'"
+
+
+def normalize_question(question: str) -> str:
+    """
+    Text used to match repeated questions: Unicode-normalized, case-folded,
+    single-spaced and without the punctuation around it, so "What is this
+    asset worth?" and "  what is this ASSET worth " share an entry.
+    """
+    text = unicodedata.normalize("NFKC", question).casefold()
+    return _SPACES.sub(" ", text).strip(_EDGE_PUNCTUATION)
+
+
+class LocalAnswerCache():
+    """
+    Per-process LRU with a TTL. Fast and free, but every worker process
+    warms its own copy.
+    """
+    def __init__(self, timeout: int, max_entries: int):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.__entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.__entries[key]
+                return None
+            self.__entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict):
+        with self.__lock:
+            self.__entries[key] = (time.monotonic() + self.timeout, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+
+class DjangoAnswerCache():
+    """
+    Stores answers in a Django cache (``CHAT_ANSWER_CACHE_ALIAS``) so every
+    process shares them. Eviction is the backend's own: least recently used
+    for locmem, culling for the file and database caches.
+    """
+    def __init__(self, timeout: int, max_entries: int):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.cache = caches[settings.CHAT_ANSWER_CACHE_ALIAS]
+
+    def get(self, key: str) -> dict | None:
+        return self.cache.get(key)
+
+    def set(self, key: str, value: dict):
+        self.cache.set(key, value, self.timeout)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class AnswerCache():
+    """
+    Agent answers for repeated questions. A question asked without previous
+    context in its agent session is shared across every session; with
+    context the answer may depend on the conversation, so it is only reused
+    inside the same session (``CHAT_ANSWER_CACHE_SESSION_SCOPED``) or not
+    cached at all. A session served from the shared entry has not sent that
+    question to the agent; ``ChatService`` sends it before a follow-up.
+    """
+    _default = None
+    _lock = threading.Lock()
+
+    def __init__(self, backend, session_scoped: bool | None = None):
+        self.backend = backend
+        self.session_scoped = settings.CHAT_ANSWER_CACHE_SESSION_SCOPED if session_scoped is None else session_scoped
+
+    @classmethod
+    def default(cls) -> "AnswerCache | None":
+        if not settings.CHAT_ANSWER_CACHE_BACKEND:
+            return None
+        with cls._lock:
+            if cls._default is None:
+                backend_class = import_string(settings.CHAT_ANSWER_CACHE_BACKEND)
+                cls._default = cls(backend_class(
+                    settings.CHAT_ANSWER_CACHE_TIMEOUT,
+                    settings.CHAT_ANSWER_CACHE_MAX_ENTRIES
+                ))
+            return cls._default
+
+    def key(self, question: str, agent_session_id: str, has_context: bool) -> str | None:
+        if has_context and not self.session_scoped:
+            return None
+        scope = agent_session_id if has_context else ""
+        digest = hashlib.sha256(f"{scope}\0{normalize_question(question)}".encode("utf-8")).hexdigest()
+        return f"chat-answer:{digest}"
+
+    def get(self, key: str | None) -> dict | None:
+        if key is None:
+            return None
+        return self.backend.get(key)
+
+    def set(self, key: str | None, value: dict):
+        if key is not None:
+            self.backend.set(key, value)
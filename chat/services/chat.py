@@ -0,0 +1,361 @@
+import codecs
+import logging
+from typing import Any, NamedTuple
+import requests
+from django.db import IntegrityError, connection
+from django.utils import timezone
+from rest_framework import status
+from archeota import settings
+from chat.models import AgentInteractionLog, ChatSession
+from chat.serializers import AnswerSerializer, QuestionSerializer
+from chat.services.agent import AgentClient
+from chat.services.answer_cache import AnswerCache
+from chat.services.log_writer import InteractionLogWriter
+from chat.services.parser import parse_body
+
+
+logger = logging.getLogger(__name__)
+
+
+class ChatError(Exception):
+    def __init__(self, payload, status_code: int):
+        super().__init__(payload)
+        self.payload = payload
+        self.status_code = status_code
+
+
+class ChatTurn(NamedTuple):
+    chat_session: ChatSession
+    question: str
+    agent_session_id: str
+    has_context: bool = False
+    unsent_question: str | None = None
+
+
+class AgentAnswer(NamedTuple):
+    answer: Any = None
+    summary: Any = None
+    additional_questions: Any = None
+    extra_questions: Any = None
+    category: Any = None
+    attributes: dict | None = None
+    successful: bool = False
+    error_message: str | None = None
+    client_message: str | None = None
+    cached: bool = False
+
+
+class AgentStream():
+    """
+    Agent response read piece by piece as it arrives. Everything read is
+    kept so the full output can be parsed once the body is done.
+    """
+    def __init__(self, response: requests.Response):
+        self.response = response
+        self.chunks: list[str] = []
+        self.error: str | None = None
+        self.__decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+        self.__content = response.iter_content(chunk_size=None)
+        self.__done = False
+
+    @property
+    def body(self) -> str:
+        return "".join(self.chunks)
+
+    def read(self) -> str | None:
+        while not self.__done:
+            raw = next(self.__content, None)
+            if raw is None:
+                self.__done = True
+                text = self.__decoder.decode(b"", final=True)
+            else:
+                text = self.__decoder.decode(raw)
+            if text:
+                self.chunks.append(text)
+                return text
+        return None
+
+    def close(self):
+        self.__done = True
+        self.response.close()
+
+
+class ChatService():
+    """
+    One question to the agent, split in three steps so the slow agent call
+    can run apart from the database work: ``prepare`` resolves the chat
+    session, ``ask`` calls the agent (or ``open_stream``/``read_stream``/
+    ``stream_answer`` to read it as it arrives) and ``finish`` logs the
+    interaction and builds the response.
+    """
+    def __init__(self, user=None, client: AgentClient | None = None, cache: AnswerCache | None = None):
+        self.user = user if user is not None and user.is_authenticated else None
+        self.client = client or AgentClient.default()
+        self.cache = cache or AnswerCache.default()
+
+    def __upsert_session(self, session_id, user, title: str) -> ChatSession | None:
+        """
+        Creates or touches the session in one statement: an anonymous
+        session is claimed by ``user``, the question is counted and the
+        title is only set for the first one. Returns ``None`` when the
+        session belongs to another user.
+        """
+        meta = ChatSession._meta
+        qn = connection.ops.quote_name
+        table = qn(meta.db_table)
+        column = {name: qn(meta.get_field(name).column) for name in (
+            'id', 'session_id', 'user', 'start_time', 'last_activity', 'title', 'interaction_count',
+            'unsent_question'
+        )}
+        now = timezone.now()
+        params = [
+            meta.get_field('session_id').get_db_prep_value(session_id, connection),
+            user.pk if user is not None else None,
+            meta.get_field('start_time').get_db_prep_value(now, connection),
+            meta.get_field('last_activity').get_db_prep_value(now, connection),
+            title,
+        ]
+        sql = f"""
+            INSERT INTO {table} ({column['session_id']}, {column['user']}, {column['start_time']},
+                                 {column['last_activity']}, {column['title']}, {column['interaction_count']})
+            VALUES (%s, %s, %s, %s, %s, 1)
+            ON CONFLICT ({column['session_id']}) DO UPDATE SET
+                {column['user']} = COALESCE({table}.{column['user']}, EXCLUDED.{column['user']}),
+                {column['last_activity']} = EXCLUDED.{column['last_activity']},
+                {column['title']} = CASE
+                    WHEN {table}.{column['interaction_count']} = 0 AND COALESCE({table}.{column['title']}, '') = ''
+                    THEN EXCLUDED.{column['title']}
+                    ELSE {table}.{column['title']}
+                END,
+                {column['interaction_count']} = {table}.{column['interaction_count']} + 1
+            WHERE {table}.{column['user']} IS NULL OR {table}.{column['user']} = EXCLUDED.{column['user']}
+            RETURNING {', '.join(column.values())}
+        """
+        sessions = list(ChatSession.objects.raw(sql, params))
+        return sessions[0] if sessions else None
+
+    def prepare(self, data) -> ChatTurn:
+        question_serializer = QuestionSerializer(data=data)
+        if not question_serializer.is_valid():
+            raise ChatError(question_serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+        user_question = question_serializer.validated_data['question']
+        requested_session_id_str = question_serializer.validated_data.get('chat_session_id')
+
+        # Determinar el usuario (autenticado o None)
+        user_for_session = self.user
+        title_text = user_question[:60] + '...' if len(user_question) > 60 else user_question
+
+        if requested_session_id_str:
+            try:
+                chat_session = self.__upsert_session(requested_session_id_str, user_for_session, title_text)
+            except IntegrityError:
+                raise ChatError(
+                    {"error": "The provided session ID cannot be used."},
+                    status.HTTP_409_CONFLICT
+                )
+            # Si la sesión pertenece a OTRO usuario
+            if chat_session is None:
+                raise ChatError(
+                    {"error": "Session ID conflict or unauthorized ID."},
+                    status.HTTP_409_CONFLICT
+                )
+        else:
+            # No hay ID, creamos una nueva sesión (anónima o con usuario)
+            chat_session = ChatSession.objects.create(
+                user=user_for_session,
+                title=title_text,
+                interaction_count=1
+            )
+
+        # Obtenemos el ID de sesión para el agente; tras la primera pregunta
+        # el agente ya tiene contexto de la conversación
+        session_id_for_agent = str(chat_session.session_id)
+        has_context = chat_session.interaction_count > 1
+
+        unsent_question = chat_session.unsent_question if has_context else None
+        return ChatTurn(chat_session, user_question, session_id_for_agent, has_context, unsent_question)
+
+    def __parse(self, body: str) -> AgentAnswer:
+        try:
+            output = parse_body(body)
+        except Exception as e_parse:
+            return AgentAnswer(
+                answer=body,
+                error_message=f"Error parsing agent JSON: {e_parse}",
+                client_message="Error processing agent response."
+            )
+        return AgentAnswer(
+            answer=output.answer,
+            summary=output.summary,
+            additional_questions=output.additional_questions,
+            extra_questions=output.extra_questions,
+            category=output.category,
+            attributes=output.attributes,
+            successful=output.answer is not None,
+            error_message=output.warning
+        )
+
+    def __request(self, turn: ChatTurn, stream: bool = False) -> requests.Response:
+        try:
+            response = self.client.ask(turn.agent_session_id, turn.question, stream=stream)
+            response.raise_for_status()
+            return response
+
+        except requests.exceptions.Timeout:
+            error_message_for_log = "Timeout: The request to the external agent exceeded the time limit."
+            raise ChatError({"error": error_message_for_log}, status.HTTP_504_GATEWAY_TIMEOUT)
+
+        except requests.exceptions.ConnectionError:
+            error_message_for_log = "Connection Error: Could not connect to the external agent service"
+            raise ChatError({"error": error_message_for_log}, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        except requests.exceptions.HTTPError as e_http:
+            error_message_for_log = f"Agent Error: The agent service returned an HTTP error {e_http.response.status_code}."
+            try:
+                actual_agent_response_or_error = e_http.response.text
+            except Exception:
+                actual_agent_response_or_error = error_message_for_log
+            raise ChatError({"error": error_message_for_log, "agent_response": actual_agent_response_or_error},
+                            status.HTTP_502_BAD_GATEWAY)
+
+        except requests.exceptions.RequestException as e_req:
+            error_message_for_log = f"Network/Request Error: {e_req}"
+            raise ChatError({"error": error_message_for_log}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def __send_unsent(self, turn: ChatTurn):
+        """
+        A first question answered from the shared cache never reached the
+        agent; it is sent before a follow-up so the agent session has the
+        whole conversation.
+        """
+        if turn.unsent_question:
+            self.__request(turn._replace(question=turn.unsent_question)).close()
+
+    def __unexpected(self, e_general: Exception) -> AgentAnswer:
+        error_message_for_log = f"Unexpected Internal Server Error: {e_general}"
+        print(f"Unexpected Internal Server Error in ChatAPIView: {e_general}")
+        return AgentAnswer(
+            answer=error_message_for_log,
+            error_message=error_message_for_log,
+            client_message="Unexpected Internal Server Error"
+        )
+
+    def __cache_key(self, turn: ChatTurn) -> str | None:
+        return self.cache.key(turn.question, turn.agent_session_id, turn.has_context)
+
+    def cached(self, turn: ChatTurn) -> AgentAnswer | None:
+        if self.cache is None:
+            return None
+        try:
+            value = self.cache.get(self.__cache_key(turn))
+        except Exception:
+            logger.exception("Answer cache read failed")
+            return None
+        if value is None:
+            return None
+        return AgentAnswer(**value)._replace(cached=True)
+
+    def __remember(self, turn: ChatTurn, answer: AgentAnswer):
+        if self.cache is None or not answer.successful or answer.error_message:
+            return
+        try:
+            self.cache.set(self.__cache_key(turn), answer._asdict())
+        except Exception:
+            logger.exception("Answer cache write failed")
+
+    def ask(self, turn: ChatTurn) -> AgentAnswer:
+        answer = self.cached(turn)
+        if answer is not None:
+            return answer
+        try:
+            self.__send_unsent(turn)
+            response = self.__request(turn)
+            answer = self.__parse(response.text)
+            self.__remember(turn, answer)
+            return answer
+        except ChatError:
+            raise
+        except Exception as e_general:
+            return self.__unexpected(e_general)
+
+    def open_stream(self, turn: ChatTurn) -> AgentStream:
+        """
+        Starts the agent call and returns once the response headers are in.
+        Fails with the same ``ChatError`` as ``ask`` when the agent cannot
+        answer at all.
+        """
+        self.__send_unsent(turn)
+        return AgentStream(self.__request(turn, stream=True))
+
+    def read_stream(self, stream: AgentStream) -> str | None:
+        """
+        Next piece of the agent output, or ``None`` once the body is done.
+        A failure halfway is kept on the stream for ``stream_answer``.
+        """
+        try:
+            return stream.read()
+        except requests.exceptions.RequestException as e_req:
+            stream.error = f"Network/Request Error: {e_req}"
+        except Exception as e_general:
+            stream.error = f"Unexpected Internal Server Error: {e_general}"
+        stream.close()
+        return None
+
+    def stream_answer(self, turn: ChatTurn, stream: AgentStream) -> AgentAnswer:
+        stream.close()
+        if stream.error:
+            return AgentAnswer(
+                answer=stream.body or stream.error,
+                error_message=stream.error,
+                client_message="Error receiving agent response."
+            )
+        answer = self.__parse(stream.body)
+        self.__remember(turn, answer)
+        return answer
+
+    def finish(self, turn: ChatTurn, answer: AgentAnswer) -> tuple[dict, int]:
+        actual_agent_response_or_error = answer.answer
+        if not actual_agent_response_or_error:
+            actual_agent_response_or_error = "Error: No actionable response was received from the agent."
+
+        log = AgentInteractionLog(
+            chat_session=turn.chat_session,
+            question_text=turn.question,
+            answer_text=actual_agent_response_or_error,
+            summary=answer.summary,
+            category=answer.category,
+            attributes=answer.attributes,
+            is_successful=answer.successful,
+            error_message=answer.error_message,
+            cache_hit=answer.cached
+        )
+        if answer.cached and not turn.has_context:
+            ChatSession.objects.filter(pk=turn.chat_session.pk).update(unsent_question=turn.question)
+        elif turn.unsent_question and not answer.cached:
+            ChatSession.objects.filter(pk=turn.chat_session.pk).update(unsent_question=None)
+
+        if settings.CHAT_LOG_DEFERRED:
+            InteractionLogWriter.default().write(log)
+        else:
+            try:
+                log.save()
+            except Exception as e_log:
+                print(f"CRITICAL ERROR: Could not save AgentInteractionLog: {e_log}")
+
+        if not answer.successful and answer.error_message:
+            return (
+                {"error": answer.client_message, "detail": answer.error_message},
+                status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        response_data = {
+            'general_response': actual_agent_response_or_error,
+            'summary': answer.summary,
+            'additional_questions': answer.additional_questions,
+            'extra_questions': answer.extra_questions,
+            'chat_session_id': turn.agent_session_id,  # Devolvemos el ID (real o temporal)
+            'category': answer.category,
+            'attributes': answer.attributes
+        }
+        return AnswerSerializer(response_data).data, status.HTTP_200_OK
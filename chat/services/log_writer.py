@@ -0,0 +1,99 @@
+import atexit
+import queue
+import threading
+from django.db import connection
+from archeota import settings
+from chat.models import AgentInteractionLog
+
+
+class InteractionLogWriter():
+    """
+    Saves ``AgentInteractionLog`` rows after the answer has been sent.
+
+    One daemon thread per process drains the queue and inserts whatever has
+    piled up with a single ``bulk_create`` on a connection it keeps open,
+    so busy periods cost one insert per batch instead of one per question.
+    At interpreter exit the queue is drained before the thread is dropped;
+    logs written after that are saved right away.
+    """
+    _default = None
+    _lock = threading.Lock()
+    shutdown_timeout = 10
+
+    def __init__(self, batch_size: int | None = None):
+        self.batch_size = batch_size or settings.CHAT_LOG_BATCH_SIZE
+        self.queue: queue.Queue[AgentInteractionLog | None] = queue.Queue()
+        self.closed = False
+        self.__closing = threading.Lock()
+        self.thread = threading.Thread(target=self.__run, name='chat-log-writer', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def default(cls) -> "InteractionLogWriter":
+        with cls._lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def write(self, log: AgentInteractionLog):
+        with self.__closing:
+            if not self.closed:
+                self.queue.put(log)
+                return
+        self.save([log])
+
+    def flush(self):
+        """Blocks until every queued log has been saved (or given up on)."""
+        self.queue.join()
+
+    def close(self, timeout: float | None = None):
+        """
+        Saves what is still queued and stops the thread, waiting at most
+        ``timeout`` seconds (``shutdown_timeout`` by default).
+        """
+        with self.__closing:
+            if self.closed:
+                return
+            self.closed = True
+            # Nothing is queued after this marker.
+            self.queue.put(None)
+        self.thread.join(self.shutdown_timeout if timeout is None else timeout)
+        if self.thread.is_alive():
+            print(f"CRITICAL ERROR: {self.queue.qsize()} AgentInteractionLog rows were not saved before exit")
+
+    @staticmethod
+    def save(logs: list[AgentInteractionLog]):
+        try:
+            AgentInteractionLog.objects.bulk_create(logs)
+            return
+        except Exception as e_log:
+            connection.close()
+            if len(logs) == 1:
+                print(f"CRITICAL ERROR: Could not save AgentInteractionLog: {e_log}")
+                return
+        # One bad row must not take the rest of the batch with it.
+        for log in logs:
+            InteractionLogWriter.save([log])
+
+    def __run(self):
+        while True:
+            logs = [self.queue.get()]
+            while len(logs) < self.batch_size:
+                try:
+                    logs.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = logs[-1] is None
+            if stop:
+                logs.pop()
+                self.queue.task_done()
+            try:
+                if logs:
+                    self.save(logs)
+            finally:
+                for _ in logs:
+                    self.queue.task_done()
+            if stop:
+                connection.close()
+                return
@@ -0,0 +1,274 @@
+import json
+import re
+from functools import lru_cache
+from json.decoder import scanstring
+from typing import Any, NamedTuple
+from jsonschema import Draft7Validator
+
+
+_QUESTIONS = {
+    "type": ["array", "null"],
+    "items": {
+        "type": "object",
+        "properties": {"question": {"type": "string"}},
+        "required": ["question"],
+    },
+}
+
+AGENT_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "general_response": {"type": ["string", "null"]},
+        "summary": {"type": ["string", "null"]},
+        "additional_questions": _QUESTIONS,
+        "extra_questions": _QUESTIONS,
+        "category": {"type": ["string", "null"], "maxLength": 100},
+        "attributes": {
+            "type": ["array", "object", "null"],
+            "items": {"type": "string"},
+            "additionalProperties": {"type": ["string", "number", "boolean", "null"]},
+        },
+    },
+}
+
+_validator = Draft7Validator(AGENT_OUTPUT_SCHEMA)
+_decoder = json.JSONDecoder()
+_JSON_TYPES = {
+    "string": (str,),
+    "array": (list,),
+    "object": (dict,),
+    "null": (type(None),),
+    "number": (int, float),
+    "boolean": (bool,),
+}
+
+# Candidate '{' tried before giving up on finding a JSON object in the text.
+MAX_OBJECT_CANDIDATES = 8
+
+# Longest prefix of a JSON string body that decodes on its own: no closing
+# quote, and no escape (or surrogate pair) cut at the end.
+_STRING_PART = re.compile(
+    r'(?:[^"\\]+|\\["\\/bfnrt]|\\u(?![dD][89abAB])[0-9a-fA-F]{4}'
+    r'|\\u[dD][89abAB][0-9a-fA-F]{2}\\u[dD][c-fC-F][0-9a-fA-F]{2})*'
+)
+
+
+class AgentOutput(NamedTuple):
+    answer: str | None
+    summary: str | None = None
+    additional_questions: list | None = None
+    extra_questions: list | None = None
+    category: str | None = None
+    attributes: dict | None = None
+    warning: str | None = None
+
+
+def extract_json(text: str) -> dict | None:
+    """
+    First JSON object found in ``text``, wherever it sits: bare, inside a
+    ```json fence or after some prose. Each candidate is decoded in place
+    from its opening brace, so the text is not copied or stripped first.
+    """
+    start = text.find("{")
+    candidates = 0
+    while start != -1 and candidates < MAX_OBJECT_CANDIDATES:
+        try:
+            value, _ = _decoder.raw_decode(text, start)
+        except ValueError:
+            value = None
+        if isinstance(value, dict):
+            return value
+        candidates += 1
+        start = text.find("{", start + 1)
+    return None
+
+
+def parse_attributes(attributes) -> dict | None:
+    """
+    ``["name|value", ...]`` as a dict. Only the first '|' separates the
+    name, so values may contain it; entries without one are kept with an
+    empty value.
+    """
+    if attributes is None:
+        return None
+    if isinstance(attributes, dict):
+        return {str(name): value for name, value in attributes.items()}
+    parsed = {}
+    for item in attributes:
+        name, _, value = item.partition("|")
+        parsed[name.strip()] = value.strip()
+    return parsed
+
+
+@lru_cache(maxsize=None)
+def _python_types(types: tuple[str, ...]) -> tuple[type, ...]:
+    return tuple(t for name in types for t in _JSON_TYPES[name])
+
+
+def _conforms(value, schema: dict) -> bool:
+    """
+    Quick check of ``value`` against the keywords ``AGENT_OUTPUT_SCHEMA``
+    uses. Full validation costs far more than decoding, so it only runs
+    when this check fails and the error messages are needed.
+    """
+    types = schema.get("type")
+    if types is not None:
+        types = (types,) if isinstance(types, str) else tuple(types)
+        if isinstance(value, bool) and "boolean" not in types:
+            return False
+        if not isinstance(value, _python_types(types)):
+            return False
+    if isinstance(value, str):
+        return len(value) <= schema.get("maxLength", len(value))
+    if isinstance(value, list):
+        items = schema.get("items")
+        return items is None or all(_conforms(item, items) for item in value)
+    if isinstance(value, dict):
+        if any(key not in value for key in schema.get("required", ())):
+            return False
+        properties = schema.get("properties", {})
+        extra = schema.get("additionalProperties")
+        for key, item in value.items():
+            item_schema = properties.get(key, extra)
+            if item_schema is not None and not _conforms(item, item_schema):
+                return False
+    return True
+
+
+def clean(data: dict) -> tuple[dict, list[str]]:
+    """
+    Drops the top-level fields that do not match ``AGENT_OUTPUT_SCHEMA``
+    instead of rejecting the whole output; returns the kept fields and a
+    message per dropped one.
+    """
+    if _conforms(data, AGENT_OUTPUT_SCHEMA):
+        return data, []
+    invalid = {}
+    for error in _validator.iter_errors(data):
+        field = error.path[0] if error.path else None
+        if field is not None and field not in invalid:
+            invalid[field] = f"{field}: {error.message}"
+    return {k: v for k, v in data.items() if k not in invalid}, list(invalid.values())
+
+
+def parse_output(output: Any) -> AgentOutput:
+    """
+    Structured answer from the agent ``output`` field. When no usable JSON
+    object is found the raw text is the answer and ``warning`` says why.
+    """
+    if isinstance(output, dict):
+        data = output
+        text = json.dumps(output)
+    else:
+        text = output if isinstance(output, str) else json.dumps(output)
+        data = extract_json(text)
+    if data is None:
+        return AgentOutput(answer=text, warning="Agent output has no JSON object; returned as text.")
+
+    data, problems = clean(data)
+    return AgentOutput(
+        answer=data.get("general_response") or text,
+        summary=data.get("summary"),
+        additional_questions=data.get("additional_questions"),
+        extra_questions=data.get("extra_questions"),
+        category=data.get("category"),
+        attributes=parse_attributes(data.get("attributes")) if "attributes" in data else None,
+        warning=f"Invalid fields dropped: {'; '.join(problems)}" if problems else None
+    )
+
+
+class _FieldReader():
+    """
+    Decodes the value of the first ``"key": "..."`` string found in a JSON
+    text fed piece by piece, returning what is complete of it on each call.
+    Input it cannot decode yet (a key or escape cut in two) is kept for the
+    next call.
+    """
+    def __init__(self, key: str):
+        self.key = f'"{key}"'
+        self.pattern = re.compile(re.escape(self.key) + r'\s*:\s*(?=\S)')
+        self.buffer = ''
+        self.state = 'key'
+        self.value_start = None
+
+    def __key(self):
+        match = self.pattern.search(self.buffer)
+        if match is None:
+            # Keep a possible partial key for the next piece.
+            at = self.buffer.rfind(self.key)
+            self.buffer = self.buffer[at:] if at != -1 else self.buffer[-len(self.key):]
+            return
+        self.value_start = self.buffer[match.end()]
+        if self.value_start == '"':
+            self.buffer = self.buffer[match.end() + 1:]
+            self.state = 'string'
+        else:
+            self.buffer = self.buffer[match.end():]
+            self.state = 'other'
+
+    def __string(self) -> str:
+        text, buffer = [], self.buffer
+        while True:
+            end = _STRING_PART.match(buffer).end()
+            if end:
+                text.append(scanstring(buffer[:end] + '"', 0, False)[0])
+            buffer = buffer[end:]
+            if buffer.startswith('"'):
+                self.state = 'done'
+                buffer = ''
+                break
+            if len(buffer) < 12:
+                # Empty, or an escape cut in two: wait for the rest.
+                break
+            # Malformed escape, kept as text.
+            text.append(buffer[0])
+            buffer = buffer[1:]
+        self.buffer = buffer
+        return "".join(text)
+
+    def feed(self, text: str) -> str:
+        if self.state in ('done', 'other'):
+            return ''
+        self.buffer += text
+        if self.state == 'key':
+            self.__key()
+        if self.state == 'string':
+            return self.__string()
+        return ''
+
+
+class AnswerStream():
+    """
+    ``general_response`` of an agent body as it arrives. The body is
+    ``{"output": ...}`` where the output is either the agent JSON itself or
+    a string holding it (fenced or not), so the answer is decoded through
+    both levels of escaping without waiting for the whole body. Bodies of
+    any other shape yield nothing; ``parse_body`` on the full body stays the
+    authoritative result.
+    """
+    def __init__(self):
+        self.__output = _FieldReader("output")
+        self.__answer = _FieldReader("general_response")
+
+    def feed(self, chunk: str) -> str:
+        output = self.__output
+        if output.state == 'other':
+            return self.__answer.feed(chunk) if output.value_start == '{' else ''
+        text = output.feed(chunk)
+        if output.state == 'other' and output.value_start == '{':
+            text, output.buffer = output.buffer, ''
+        return self.__answer.feed(text) if text else ''
+
+
+def parse_body(body: str) -> AgentOutput:
+    """
+    Parses a whole agent HTTP body: ``{"output": ...}`` is unpacked, any
+    other JSON or plain text is taken as the answer itself.
+    """
+    try:
+        api_data = json.loads(body)
+    except ValueError:
+        return AgentOutput(answer=body)
+    if isinstance(api_data, dict) and "output" in api_data:
+        return parse_output(api_data["output"])
+    return AgentOutput(answer=body)
@@ -1,3 +1,198 @@
-from django.test import TestCase
+import json
+import random
+import uuid
+from unittest import mock
+from django.test import SimpleTestCase, TestCase
+from archeota import settings
+from chat.models import ChatSession
+from chat.services.answer_cache import AnswerCache, LocalAnswerCache
+from chat.services.chat import ChatService
+from chat.services.parser import (
+    AGENT_OUTPUT_SCHEMA,
+    AnswerStream,
+    _conforms,
+    _validator,
+    clean,
+    extract_json,
+    parse_body,
+    parse_output,
+)
 
-# Create your tests here.
+
+PAYLOAD = {
+    "general_response": "Monet painted it in 1872.",
+    "summary": "Impression, Sunrise",
+    "additional_questions": [{"question": "Where is it?"}],
+    "extra_questions": None,
+    "category": "Art",
+    "attributes": ["Artist|Monet", "Note|a|b"],
+}
+
+
+class ExtractJsonTests(SimpleTestCase):
+    def test_bare_object(self):
+        self.assertEqual(extract_json(json.dumps(PAYLOAD)), PAYLOAD)
+
+    def test_fenced_object(self):
+        self.assertEqual(extract_json("```json\n" + json.dumps(PAYLOAD) + "\n```"), PAYLOAD)
+
+    def test_prose_and_trailing_text(self):
+        text = 'Sure! Here it is: {"general_response": "hi"} Let me know if you need more.'
+        self.assertEqual(extract_json(text), {"general_response": "hi"})
+
+    def test_braces_inside_strings(self):
+        data = {"general_response": "use {curly} and \"quoted {\" braces }", "summary": "}{"}
+        self.assertEqual(extract_json("```json\n" + json.dumps(data) + "\n```"), data)
+
+    def test_skips_invalid_candidates(self):
+        self.assertEqual(extract_json('{not json} then {"a": {"b": 1}}'), {"a": {"b": 1}})
+
+    def test_malformed(self):
+        self.assertIsNone(extract_json('{"general_response": "cut'))
+        self.assertIsNone(extract_json("no json here"))
+        self.assertIsNone(extract_json("[1, 2, 3]"))
+
+
+class CleanTests(SimpleTestCase):
+    def test_valid_output_is_kept(self):
+        self.assertEqual(clean(PAYLOAD), (PAYLOAD, []))
+
+    def test_invalid_fields_are_dropped(self):
+        data = {**PAYLOAD, "category": 5, "additional_questions": ["not an object"]}
+        kept, problems = clean(data)
+        self.assertNotIn("category", kept)
+        self.assertNotIn("additional_questions", kept)
+        self.assertEqual(kept["general_response"], PAYLOAD["general_response"])
+        self.assertEqual(len(problems), 2)
+
+    def test_too_long_category(self):
+        kept, problems = clean({"general_response": "x", "category": "c" * 101})
+        self.assertEqual(kept, {"general_response": "x"})
+        self.assertTrue(problems[0].startswith("category:"))
+
+    def test_fast_check_agrees_with_jsonschema(self):
+        values = [None, True, False, 0, 1.5, "", "x" * 101, [], {}, ["a|b"], [1], {"question": "q"}, {"k": [1]},
+                  [{"question": "q"}], [{"question": 1}], [{"other": "q"}], {"k": "v", "n": 1, "b": False}]
+        fields = list(AGENT_OUTPUT_SCHEMA["properties"]) + ["unknown"]
+        rnd = random.Random(24)
+        for _ in range(2000):
+            data = {field: rnd.choice(values) for field in rnd.sample(fields, rnd.randint(0, len(fields)))}
+            self.assertEqual(_conforms(data, AGENT_OUTPUT_SCHEMA), _validator.is_valid(data), data)
+
+
+class ParseOutputTests(SimpleTestCase):
+    def test_fenced_output(self):
+        output = parse_output("```json\n" + json.dumps(PAYLOAD) + "\n```")
+        self.assertEqual(output.answer, PAYLOAD["general_response"])
+        self.assertEqual(output.attributes, {"Artist": "Monet", "Note": "a|b"})
+        self.assertIsNone(output.warning)
+
+    def test_dict_output(self):
+        self.assertEqual(parse_output(PAYLOAD).summary, PAYLOAD["summary"])
+
+    def test_text_without_json(self):
+        output = parse_output("I do not know.")
+        self.assertEqual(output.answer, "I do not know.")
+        self.assertIsNotNone(output.warning)
+
+    def test_schema_failure_keeps_the_answer(self):
+        output = parse_output('{"general_response": "ok", "category": 5}')
+        self.assertEqual(output.answer, "ok")
+        self.assertIsNone(output.category)
+        self.assertIn("category", output.warning)
+
+    def test_missing_answer_falls_back_to_text(self):
+        text = '{"summary": "only a summary"}'
+        self.assertEqual(parse_output(text).answer, text)
+
+
+class ParseBodyTests(SimpleTestCase):
+    def test_output_envelope(self):
+        body = json.dumps({"output": "```json\n" + json.dumps(PAYLOAD) + "\n```"})
+        self.assertEqual(parse_body(body).answer, PAYLOAD["general_response"])
+
+    def test_plain_and_foreign_bodies(self):
+        self.assertEqual(parse_body("hello").answer, "hello")
+        self.assertEqual(parse_body('{"foo": 1}').answer, '{"foo": 1}')
+        self.assertEqual(parse_body('{"output": "cut').answer, '{"output": "cut')
+
+
+class AnswerStreamTests(SimpleTestCase):
+    answer = 'hola ñandú "quoted" \\ {braces}\nline 😀'
+
+    def assert_streams(self, body: str):
+        rnd = random.Random(len(body))
+        for _ in range(50):
+            stream, pieces, i = AnswerStream(), [], 0
+            while i < len(body):
+                size = rnd.randint(1, 9)
+                pieces.append(stream.feed(body[i:i + size]))
+                i += size
+            self.assertEqual("".join(pieces), self.answer)
+        self.assertEqual(parse_body(body).answer, self.answer)
+
+    def test_string_output(self):
+        data = {"summary": 'not "general_response": here', "general_response": self.answer}
+        self.assert_streams(json.dumps({"output": "```json\n" + json.dumps(data) + "\n```"}))
+        self.assert_streams(json.dumps({"output": json.dumps(data, ensure_ascii=False)}, ensure_ascii=False))
+
+    def test_object_output(self):
+        self.assert_streams(json.dumps({"output": {"general_response": self.answer}}, indent=2))
+
+    def test_other_bodies(self):
+        self.assertEqual(AnswerStream().feed("plain text"), "")
+        self.assertEqual(AnswerStream().feed('{"output": 5}'), "")
+
+
+class FakeAgentResponse():
+    def __init__(self, question: str):
+        self.text = json.dumps({"output": {"general_response": f"answer to {question}"}})
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeAgentClient():
+    def __init__(self):
+        self.calls = []
+
+    def ask(self, session_id, question, stream=False):
+        self.calls.append((session_id, question))
+        return FakeAgentResponse(question)
+
+
+@mock.patch.object(settings, 'CHAT_LOG_DEFERRED', False)
+class AnswerCacheSessionTests(TestCase):
+    def setUp(self):
+        self.agent = FakeAgentClient()
+        self.cache = AnswerCache(LocalAnswerCache(60, 100), session_scoped=False)
+
+    def ask(self, question: str, session_id: str):
+        service = ChatService(client=self.agent, cache=self.cache)
+        turn = service.prepare({"question": question, "chat_session_id": session_id})
+        answer = service.ask(turn)
+        payload, _ = service.finish(turn, answer)
+        return answer, payload
+
+    def test_cached_first_question_is_sent_before_the_follow_up(self):
+        first, second = str(uuid.uuid4()), str(uuid.uuid4())
+        self.ask("What is this painting?", first)
+        answer, payload = self.ask("what is this painting", second)
+        self.assertTrue(answer.cached)
+        self.assertEqual(payload["general_response"], "answer to What is this painting?")
+        self.assertEqual(self.agent.calls, [(first, "What is this painting?")])
+        self.assertEqual(ChatSession.objects.get(session_id=second).unsent_question, "what is this painting")
+
+        answer, _ = self.ask("Who painted it?", second)
+        self.assertFalse(answer.cached)
+        self.assertEqual(self.agent.calls[1:], [
+            (second, "what is this painting"),
+            (second, "Who painted it?"),
+        ])
+        self.assertIsNone(ChatSession.objects.get(session_id=second).unsent_question)
+
+        self.ask("When?", second)
+        self.assertEqual(self.agent.calls[3:], [(second, "When?")])
@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import ChatAPIView, UserChatSessionListView, ChatSessionInteractionListView, AssociateChatSessionView
+from .views import ChatAPIView, AsyncChatAPIView, ChatStreamAPIView, UserChatSessionListView, ChatSessionInteractionListView, AssociateChatSessionView
 
 urlpatterns = [
     path('', ChatAPIView.as_view(), name='chat_api'),
+    path('async/', AsyncChatAPIView.as_view(), name='chat_api_async'),
+    path('stream/', ChatStreamAPIView.as_view(), name='chat_api_stream'),
     path('sessions/', UserChatSessionListView.as_view(), name='user-chat-session-list'),
     path('sessions/associate/', AssociateChatSessionView.as_view(), name='chat-session-associate'),
     path('sessions/<uuid:session_uuid>/', ChatSessionInteractionListView.as_view(),
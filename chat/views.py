@@ -1,238 +1,43 @@
-import requests
-import os
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+from rest_framework import exceptions
 from rest_framework.generics import ListAPIView
+from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework import status, generics
 from .serializers import (
     QuestionSerializer, 
-    AnswerSerializer, 
     ChatSessionSerializer, 
     AgentInteractionLogSerializer,
     AssociateSessionSerializer)
 from .models import AgentInteractionLog, ChatSession
+from .services.chat import ChatError, ChatService
+from .services.parser import AnswerStream
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.db import IntegrityError
-import json
-import uuid
 from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 from rest_framework.views import APIView
 
 
-AGENT_API_URL = os.getenv("AGENT_API_URL")
-REQUEST_TIMEOUT = 20
-
-
 class ChatAPIView(generics.GenericAPIView):
     serializer_class = QuestionSerializer
     permission_classes = [AllowAny]  # <-- Permite peticiones públicas
     throttle_classes = [AnonRateThrottle, UserRateThrottle]
 
     def post(self, request, *args, **kwargs):
-        question_serializer = QuestionSerializer(data=request.data)
-        if not question_serializer.is_valid():
-            return Response(question_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-        user_question = question_serializer.validated_data['question']
-        requested_session_id_str = question_serializer.validated_data.get('chat_session_id')
-
-        # Determinar el usuario (autenticado o None)
-        user_for_session = request.user if request.user.is_authenticated else None
-
-        chat_session = None
-
-        if requested_session_id_str:
-            try:
-                chat_session, created = ChatSession.objects.get_or_create(
-                    session_id=requested_session_id_str,
-                    # Si se crea, se asigna el usuario (o None)
-                    defaults={'user': user_for_session}
-                )
-
-                if not created:
-                    # Si ya existía y era anónima, y ahora el usuario SÍ está logueado
-                    if chat_session.user is None and user_for_session is not None:
-                        chat_session.user = user_for_session  # Se la asignamos
-
-                    # Si la sesión pertenece a OTRO usuario
-                    elif chat_session.user is not None and chat_session.user != user_for_session:
-                        return Response(
-                            {"error": "Session ID conflict or unauthorized ID."},
-                            status=status.HTTP_409_CONFLICT
-                        )
-
-                    chat_session.save()
-
-            except IntegrityError:
-                return Response(
-                    {"error": "The provided session ID cannot be used."},
-                    status=status.HTTP_409_CONFLICT
-                )
-        else:
-            # No hay ID, creamos una nueva sesión (anónima o con usuario)
-            chat_session = ChatSession.objects.create(user=user_for_session)
-
-        # Obtenemos el ID de sesión (real o temporal) para el agente
-        session_id_for_agent = str(chat_session.session_id)
-
-        # ¡CORRECCIÓN DEL ERROR 'NoneType'!
-        # Esta lógica de título ahora SÍ funciona porque chat_session SIEMPRE es un objeto
-        if chat_session.interactions.count() == 0 and not chat_session.title:
-            title_text = user_question[:60] + '...' if len(user_question) > 60 else user_question
-            chat_session.title = title_text
-            chat_session.save(update_fields=['title', 'last_activity'])
-        else:
-            # --- LÓGICA PARA USUARIOS ANÓNIMOS (No guardar nada) ---
-            if requested_session_id_str:
-                # Usamos el ID que manda el frontend (para mantener contexto)
-                session_id_for_agent = requested_session_id_str
-            else:
-                # Generamos un ID temporal solo para el agente
-                session_id_for_agent = str(uuid.uuid4())
-
-        # (El bloque del título fue eliminado de aquí)
-
-        agent_response_text_for_client = "Error: No actionable response was received from the agent."
-        actual_agent_response_or_error = None
-        summary = None
-        additional_questions = None
-        extra_questions = None
-        interaction_successful_flag = False
-        error_message_for_log = None
-        category = None
-        attributes = None
-        dict_attributes = None
-        status_code_for_response = status.HTTP_500_INTERNAL_SERVER_ERROR
-
+        service = ChatService(request.user)
         try:
-            # Usamos el ID de sesión (real o temporal) para llamar al agente
-            agent_params = {'sesionid': session_id_for_agent, 'question': user_question}
+            turn = service.prepare(request.data)
+            answer = service.ask(turn)
+        except ChatError as e:
+            return Response(e.payload, status=e.status_code)
 
-            response = requests.get(
-                AGENT_API_URL,
-                params=agent_params,
-                timeout=REQUEST_TIMEOUT
-            )
-
-            response.raise_for_status()
-
-            try:
-                api_data = response.json()
-                if 'output' in api_data:
-                    r = api_data['output']
-
-                    if r.startswith("```json"):
-                        json_string = r.strip("```json\n").strip("```")
-                        json_data = json.loads(json_string)
-                    else:
-                        json_data = json.loads(r)
-
-                    if 'general_response' in json_data:
-                        actual_agent_response_or_error = json_data['general_response']
-                    if 'summary' in json_data:
-                        summary = json_data['summary']
-                    if 'additional_questions' in json_data:
-                        additional_questions = json_data['additional_questions']
-                    if 'extra_questions' in json_data:
-                        extra_questions = json_data['extra_questions']
-                    if 'category' in json_data:
-                        category = json_data['category']
-                    if 'attributes' in json_data:
-                        tmp = json_data['attributes']
-                        if tmp:
-                            dict_attributes = dict(item.split('|') for item in tmp)
-                        else:
-                            dict_attributes = {}
-
-                    if not actual_agent_response_or_error:
-                        actual_agent_response_or_error = r
-
-                else:
-                    actual_agent_response_or_error = response.text
-                    additional_questions = None
-
-                if actual_agent_response_or_error is not None:
-                    interaction_successful_flag = True
-                    agent_answer_text_for_client = actual_agent_response_or_error
-
-            except requests.exceptions.JSONDecodeError:
-                actual_agent_response_or_error = response.text
-                interaction_successful_flag = True
-                agent_answer_text_for_client = actual_agent_response_or_error
-
-            except Exception as e_parse:
-                actual_agent_response_or_error = response.text
-                error_message_for_log = f"Error parsing agent JSON: {e_parse}"
-                agent_answer_text_for_client = "Error processing agent response."
-
-        except requests.exceptions.Timeout:
-            error_message_for_log = "Timeout: The request to the external agent exceeded the time limit."
-            actual_agent_response_or_error = error_message_for_log
-            agent_answer_text_for_client = error_message_for_log
-            return Response({"error": error_message_for_log}, status=status.HTTP_504_GATEWAY_TIMEOUT)
-
-        except requests.exceptions.ConnectionError:
-            error_message_for_log = "Connection Error: Could not connect to the external agent service"
-            actual_agent_response_or_error = error_message_for_log
-            agent_answer_text_for_client = error_message_for_log
-
-            return Response({"error": error_message_for_log}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-        except requests.exceptions.HTTPError as e_http:
-            error_message_for_log = f"Agent Error: The agent service returned an HTTP error {e_http.response.status_code}."
-            try:
-                actual_agent_response_or_error = e_http.response.text
-            except:
-                actual_agent_response_or_error = error_message_for_log
-            agent_answer_text_for_client = error_message_for_log
-            return Response({"error": error_message_for_log, "agent_response": actual_agent_response_or_error},
-                            status=status.HTTP_502_BAD_GATEWAY)
-        except requests.exceptions.RequestException as e_req:
-            error_message_for_log = f"Network/Request Error: {e_req}"
-            actual_agent_response_or_error = error_message_for_log
-            agent_answer_text_for_client = error_message_for_log
-            return Response({"error": error_message_for_log}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        except Exception as e_general:
-            error_message_for_log = f"Unexpected Internal Server Error: {e_general}"
-            actual_agent_response_or_error = error_message_for_log
-            agent_answer_text_for_client = "Unexpected Internal Server Error"
-
-            print(f"Unexpected Internal Server Error in ChatAPIView: {e_general}")
-
-        if error_message_for_log and not agent_response_text_for_client.startswith("Error:"):
-            agent_response_text_for_client = error_message_for_log
-        if not actual_agent_response_or_error:
-            actual_agent_response_or_error = agent_response_text_for_client
-
-        try:
-            AgentInteractionLog.objects.create(
-                chat_session=chat_session,  # Solo se usa si está autenticado
-                question_text=user_question,
-                answer_text=actual_agent_response_or_error,
-                summary=summary,
-                category=category,
-                attributes=dict_attributes,
-                is_successful=interaction_successful_flag,
-                error_message=error_message_for_log
-            )
-        except Exception as e_log:
-            print(f"CRITICAL ERROR: Could not save AgentInteractionLog: {e_log}")
-
-        if not interaction_successful_flag and error_message_for_log:
-            return Response({"error": agent_answer_text_for_client, "detail": error_message_for_log},
-                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        response_data = {
-            'general_response': actual_agent_response_or_error,
-            'summary': summary,
-            'additional_questions': additional_questions,
-            'extra_questions': extra_questions,
-            'chat_session_id': session_id_for_agent,  # Devolvemos el ID (real o temporal)
-            'category': category,
-            'attributes': dict_attributes
-        }
-
-        answer_serializer = AnswerSerializer(response_data)
-        return Response(answer_serializer.data, status=status.HTTP_200_OK)
+        payload, status_code = service.finish(turn, answer)
+        return Response(payload, status=status_code)
 
     def get(self, request, *args, **kwargs):
         return Response(
@@ -241,6 +46,118 @@ class ChatAPIView(generics.GenericAPIView):
         )
 
 
+def run_api_checks(view_class, request) -> Request:
+    """
+    Wraps a plain Django request the way ``view_class`` would and runs its
+    DRF authentication, permission and throttle checks, so async views can
+    share the policies of their ``APIView`` counterpart.
+    """
+    view = view_class()
+    view.args, view.kwargs = (), {}
+    drf_request = view.initialize_request(request)
+    view.request = drf_request
+    view.headers = view.default_response_headers
+    view.initial(drf_request)
+    return drf_request
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncChatAPIView(View):
+    """
+    Same contract as ``ChatAPIView`` for ASGI deployments. The database work
+    runs in the usual sync thread while the agent call runs in its own
+    thread, so slow answers do not hold a worker process. Authentication,
+    throttling and parsing come from ``ChatAPIView`` through
+    ``run_api_checks``.
+    """
+    api_view_class = ChatAPIView
+    renderer_class = CamelCaseJSONRenderer
+
+    def _prepare(self, request):
+        try:
+            drf_request = run_api_checks(self.api_view_class, request)
+            data = drf_request.data
+        except exceptions.APIException as e:
+            payload = e.detail if isinstance(e.detail, (list, dict)) else {"detail": e.detail}
+            raise ChatError(payload, e.status_code)
+
+        service = ChatService(drf_request.user)
+        return service, service.prepare(data)
+
+    def _response(self, payload, status_code: int) -> HttpResponse:
+        return HttpResponse(
+            self.renderer_class().render(payload),
+            status=status_code,
+            content_type=self.renderer_class.media_type
+        )
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            service, turn = await sync_to_async(self._prepare)(request)
+            answer = await sync_to_async(service.ask, thread_sensitive=False)(turn)
+        except ChatError as e:
+            return self._response(e.payload, e.status_code)
+
+        payload, status_code = await sync_to_async(service.finish)(turn, answer)
+        return self._response(payload, status_code)
+
+    async def get(self, request, *args, **kwargs):
+        return self._response(
+            {"message": "Please use the POST method with a JSON {'question': 'your_question'} to get a response."},
+            status.HTTP_405_METHOD_NOT_ALLOWED
+        )
+
+
+class ChatStreamAPIView(AsyncChatAPIView):
+    """
+    Streams the agent answer as Server-Sent Events while it arrives:
+    ``token`` events carry the next piece of the decoded ``general_response``
+    text, and a final ``done`` (or ``error``) event carries the parsed answer
+    once the interaction has been logged.
+    """
+    def _event(self, name: str, payload) -> bytes:
+        return b"event: " + name.encode() + b"\ndata: " + self.renderer_class().render(payload) + b"\n\n"
+
+    async def _finish(self, service: ChatService, turn, answer):
+        payload, status_code = await sync_to_async(service.finish)(turn, answer)
+        if status_code == status.HTTP_200_OK:
+            return self._event("done", payload)
+        return self._event("error", {**payload, "status": status_code})
+
+    async def _events(self, service: ChatService, turn, stream):
+        try:
+            read = sync_to_async(service.read_stream, thread_sensitive=False)
+            answer_text = AnswerStream()
+            while (chunk := await read(stream)) is not None:
+                text = answer_text.feed(chunk)
+                if text:
+                    yield self._event("token", {"text": text})
+            answer = await sync_to_async(service.stream_answer, thread_sensitive=False)(turn, stream)
+            yield await self._finish(service, turn, answer)
+        finally:
+            stream.close()
+
+    async def _cached_events(self, service: ChatService, turn, answer):
+        yield await self._finish(service, turn, answer)
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            service, turn = await sync_to_async(self._prepare)(request)
+            answer = await sync_to_async(service.cached, thread_sensitive=False)(turn)
+            if answer is not None:
+                events = self._cached_events(service, turn, answer)
+            else:
+                stream = await sync_to_async(service.open_stream, thread_sensitive=False)(turn)
+                events = self._events(service, turn, stream)
+        except ChatError as e:
+            return self._response(e.payload, e.status_code)
+
+        response = StreamingHttpResponse(events, content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
 class UserChatSessionListView(ListAPIView):
     serializer_class = ChatSessionSerializer
     permission_classes = [IsAuthenticated]
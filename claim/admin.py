@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ClaimAction,  ClaimActionTransaction, ImportLog, ClassActionLawsuit
+from .models import ClaimAction,  ClaimActionTransaction, ClaimJob, ImportJob, ImportLog, ClassActionLawsuit
 
 @admin.register(ClassActionLawsuit)
 class ClassActionLawsuitAdmin(admin.ModelAdmin):
@@ -12,3 +12,10 @@ class ClaimActionAdmin(admin.ModelAdmin):
 admin.site.register(ClaimActionTransaction)
 admin.site.register(ImportLog)
 
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_filter = ["status"]
+
+@admin.register(ClaimJob)
+class ClaimJobAdmin(admin.ModelAdmin):
+    list_filter = ["status"]
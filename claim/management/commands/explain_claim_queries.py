@@ -0,0 +1,87 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Max, Q
+from claim.models import ActionsHoldings, ClaimActionTransaction
+from claim.services.eligibility import EligibilityService
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints the query plan and timing of the hot claim/holding lookups. "
+        "With --compare the same queries are also explained with the composite "
+        "indexes temporarily dropped, inside a transaction that is rolled back."
+    )
+
+    models = [ActionsHoldings, ClaimActionTransaction]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='User id to query, defaults to the one with most holdings')
+        parser.add_argument('--symbol', type=str, help='Symbol to query, defaults to that user\'s busiest symbol')
+        parser.add_argument('--compare', action='store_true', help='Also explain the queries without the indexes')
+        parser.add_argument('--analyze', action='store_true', help='Use EXPLAIN ANALYZE (PostgreSQL only)')
+        parser.add_argument('--repeat', type=int, default=20, help='Executions used for the timing')
+
+    def __target(self, options):
+        qs = ActionsHoldings.objects.all()
+        if options['user']:
+            qs = qs.filter(user_id=options['user'])
+        if options['symbol']:
+            qs = qs.filter(symbol=options['symbol'])
+        busiest = (qs.values('user_id', 'company_id', 'symbol')
+                   .annotate(total=Count('id'))
+                   .order_by('-total')
+                   .first())
+        if busiest is None:
+            raise CommandError("There are no holdings to explain.")
+        return busiest
+
+    def __queries(self, target):
+        buy_filter = Q(activity__icontains='BUY') | Q(activity__icontains='INCOME')
+        buy_codes = [ClaimActionTransaction.ActivityChoices.BUY, ClaimActionTransaction.ActivityChoices.INCOME]
+        holdings = ActionsHoldings.objects.filter(user_id=target['user_id'], symbol=target['symbol'])
+        transactions = ClaimActionTransaction.objects.filter(user_id=target['user_id'])
+        return {
+            'open lots': holdings.filter(useless=False).filter(buy_filter).order_by('lot_number', 'id'),
+            'last lot number': holdings.filter(buy_filter).values('user_id').annotate(last=Max('lot_number')),
+            'company holdings': (
+                EligibilityService()
+                .holdings(target['company_id'], target['symbol'], '1900-01-01', '2100-01-01')
+                .order_by('start_date', 'id')
+            ),
+            'oldest buy': (
+                transactions
+                .filter(symbol=target['symbol'], activity_code__in=buy_codes)
+                .order_by('trade_date', 'id')[:1]
+            ),
+            'transaction listing': transactions.order_by('-trade_date', 'pk')[:10],
+        }
+
+    def __report(self, title, target, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        explain_options = {'analyze': True} if options['analyze'] and connection.vendor == 'postgresql' else {}
+        for name, qs in self.__queries(target).items():
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                list(qs.all())
+            elapsed = (time.perf_counter() - started) * 1000 / options['repeat']
+            self.stdout.write(self.style.SUCCESS(f"-- {name}: {elapsed:.2f} ms"))
+            self.stdout.write(qs.explain(**explain_options))
+            self.stdout.write('')
+
+    def handle(self, *args, **options):
+        target = self.__target(options)
+        self.stdout.write(
+            f"user={target['user_id']} company={target['company_id']} "
+            f"symbol={target['symbol']} holdings={target['total']}"
+        )
+        if options['compare']:
+            if not connection.features.can_rollback_ddl:
+                raise CommandError("--compare needs a database with transactional DDL.")
+            with transaction.atomic(), connection.cursor() as cursor:
+                for model in self.models:
+                    for index in model._meta.indexes:
+                        cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+                self.__report('Without indexes', target, options)
+                transaction.set_rollback(True)
+        self.__report('With indexes', target, options)
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from claim.models import ClaimAction
+from claim.services.batch import ClaimBatchService
+from claim.services.eligibility import EligibilityService
+from claim.services.preview import ClaimPreviewService
+from users.models import Company
+
+
+class Command(BaseCommand):
+    help = (
+        "Processes claim actions in one run: one claim across many companies "
+        "(--claim with --company/--all-companies) or every open claim of the "
+        "given companies (--company without --claim)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Email of the user the run is performed as')
+        parser.add_argument('--claim', type=int, action='append', help='Claim action id, can be repeated')
+        parser.add_argument('--company', type=int, action='append', help='Company id, can be repeated')
+        parser.add_argument('--all-companies', action='store_true', help='Target every company')
+        parser.add_argument('--chunk-size', type=int, help='Holdings per insert/flush chunk')
+        parser.add_argument('--dry-run', action='store_true', help='Only print the preview of every pair')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.select_related('profile__company').get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist.")
+
+        companies = None
+        if options['all_companies']:
+            companies = list(Company.objects.order_by('id'))
+        elif options['company']:
+            companies = list(Company.objects.filter(pk__in=options['company']).order_by('id'))
+        claims = None
+        if options['claim']:
+            claims = list(ClaimAction.objects.filter(pk__in=options['claim']).select_related('company').order_by('id'))
+        if claims is None and companies is None:
+            raise CommandError("Give at least one --claim or --company.")
+
+        targets = ClaimBatchService.targets(claims, companies)
+        if not targets:
+            raise CommandError("There is nothing to process.")
+
+        if options['dry_run'] and claims is None:
+            # Every open claim of the companies, matched in one query.
+            for claim in EligibilityService().open_claims(companies):
+                self.stdout.write(
+                    f"claim={claim.pk} company={claim.company_id} users={claim.users_count} "
+                    f"holdings={claim.holdings_count} exposure={claim.exposure}"
+                )
+            return
+
+        if options['dry_run']:
+            for claim, target_companies in targets.items():
+                for company in target_companies:
+                    preview = ClaimPreviewService(claim, company).preview()
+                    self.stdout.write(
+                        f"claim={claim.pk} company={company.pk} users={preview['users_count']} "
+                        f"holdings={preview['holdings_count']} exposure={preview['exposure_total']}"
+                    )
+            return
+
+        jobs = ClaimBatchService(user, options['chunk_size']).run(targets)
+        for job in jobs:
+            style = self.style.SUCCESS if job.status == job.StatusChoices.DONE else self.style.ERROR
+            self.stdout.write(style(
+                f"claim={job.claim_id} company={job.company_id} job={job.claim_job_id} {job.status} "
+                f"users={job.users_total} sent={job.users_sent} failed={job.users_failed}"
+                + (f" {job.error_message}" if job.error_message else "")
+            ))
@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand
+from claim.models import ImportJob
+from claim.services.importer import ImportService
+
+
+class Command(BaseCommand):
+    help = (
+        "Processes pending transaction import jobs. Use --loop to keep polling as a worker and "
+        "--requeue-running to recover jobs left RUNNING by a worker that died "
+        "(no progress for --stale-after seconds)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new jobs')
+        parser.add_argument('--interval', type=int, default=5, help='Seconds between polls when looping')
+        parser.add_argument('--requeue-running', action='store_true',
+                            help='Move stale RUNNING jobs back to PENDING (or FAILED when rows were already inserted)')
+        parser.add_argument('--stale-after', type=int,
+                            help='Seconds without progress before a RUNNING job is stale (JOB_STALE_AFTER)')
+
+    def handle(self, *args, **options):
+        if options['requeue_running']:
+            requeued, failed = ImportService.requeue_running(options['stale_after'])
+            self.stdout.write(f"Requeued {requeued} running import jobs, failed {failed} partially imported")
+        while True:
+            pending = list(
+                ImportJob.objects
+                .filter(status=ImportJob.StatusChoices.PENDING)
+                .order_by('created_at')
+                .values_list('pk', flat=True)
+            )
+            for job_pk in pending:
+                ImportService.run_job(job_pk)
+                self.stdout.write(f"Processed import job {job_pk}")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
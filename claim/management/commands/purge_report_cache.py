@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from claim.services.report_cache import ReportCache
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes cached claim report PDFs older than REPORT_CACHE_TTL and trims the cache "
+        "to REPORT_CACHE_MAX_BYTES. Run it periodically so expired reports do not wait for the next write."
+    )
+
+    def handle(self, *args, **options):
+        ReportCache().evict()
+        self.stdout.write("Report cache purged")
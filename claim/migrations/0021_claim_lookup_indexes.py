@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-17 17:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claim', '0020_importjob'),
+        ('users', '0018_alter_customuser_options_alter_customuser_role_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actionsholdings',
+            index=models.Index(fields=['user', 'symbol', 'lot_number'], name='holding_user_symbol_lot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actionsholdings',
+            index=models.Index(condition=models.Q(('useless', False)), fields=['user', 'symbol', 'lot_number'], name='holding_open_lot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actionsholdings',
+            index=models.Index(condition=models.Q(('useless', False)), fields=['company', 'symbol', 'start_date', 'end_date'], name='holding_company_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claimactiontransaction',
+            index=models.Index(fields=['user', 'symbol', 'trade_date'], name='transaction_user_symbol_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claimactiontransaction',
+            index=models.Index(fields=['user', '-trade_date', 'id'], name='transaction_user_date_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claim', '0021_claim_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='claimactiontransaction',
+            name='activity_code',
+            field=models.CharField(choices=[('BUY', 'Buy'), ('INCOME', 'Income'), ('SELL', 'Sell'), ('OTHER', 'Other')], default='OTHER', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='claimactiontransaction',
+            name='trade_day',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
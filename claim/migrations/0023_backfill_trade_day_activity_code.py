@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:10
+
+from dateutil import parser as date_parser
+from django.db import migrations
+
+
+def normalize_activity(activity):
+    if activity is None:
+        return 'OTHER'
+    activity = str(activity).strip().upper()
+    if 'BUY' in activity:
+        return 'BUY'
+    if 'INCOME' in activity:
+        return 'INCOME'
+    if activity == 'SELL':
+        return 'SELL'
+    return 'OTHER'
+
+
+def parse_trade_date(value):
+    if not value or not str(value).strip():
+        return None
+    try:
+        return date_parser.parse(str(value).strip()).date()
+    except (ValueError, OverflowError):
+        return None
+
+
+def backfill(apps, schema_editor):
+    ClaimActionTransaction = apps.get_model('claim', 'ClaimActionTransaction')
+    batch = []
+    for row in ClaimActionTransaction.objects.only('id', 'trade_date', 'activity').iterator(chunk_size=2000):
+        row.trade_day = parse_trade_date(row.trade_date)
+        row.activity_code = normalize_activity(row.activity)
+        batch.append(row)
+        if len(batch) >= 2000:
+            ClaimActionTransaction.objects.bulk_update(batch, ['trade_day', 'activity_code'])
+            batch = []
+    if batch:
+        ClaimActionTransaction.objects.bulk_update(batch, ['trade_day', 'activity_code'])
+
+
+def restore(apps, schema_editor):
+    ClaimActionTransaction = apps.get_model('claim', 'ClaimActionTransaction')
+    batch = []
+    for row in ClaimActionTransaction.objects.only('id', 'trade_day').iterator(chunk_size=2000):
+        row.trade_date = str(row.trade_day) if row.trade_day else None
+        batch.append(row)
+        if len(batch) >= 2000:
+            ClaimActionTransaction.objects.bulk_update(batch, ['trade_date'])
+            batch = []
+    if batch:
+        ClaimActionTransaction.objects.bulk_update(batch, ['trade_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claim', '0022_claimactiontransaction_activity_code_trade_day'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, restore),
+    ]
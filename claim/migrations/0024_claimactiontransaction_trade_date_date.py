@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claim', '0023_backfill_trade_day_activity_code'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='claimactiontransaction',
+            name='transaction_user_symbol_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='claimactiontransaction',
+            name='transaction_user_date_idx',
+        ),
+        migrations.RemoveField(
+            model_name='claimactiontransaction',
+            name='trade_date',
+        ),
+        migrations.RenameField(
+            model_name='claimactiontransaction',
+            old_name='trade_day',
+            new_name='trade_date',
+        ),
+        migrations.AddIndex(
+            model_name='claimactiontransaction',
+            index=models.Index(fields=['user', 'symbol', 'trade_date'], name='transaction_user_symbol_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claimactiontransaction',
+            index=models.Index(fields=['user', '-trade_date', 'id'], name='transaction_user_date_idx'),
+        ),
+    ]
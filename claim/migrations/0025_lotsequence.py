@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claim', '0024_claimactiontransaction_trade_date_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LotSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=20)),
+                ('last_lot_number', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lot_sequences', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Lot Sequence',
+                'verbose_name_plural': 'Lot Sequences',
+                'constraints': [models.UniqueConstraint(fields=('user', 'symbol'), name='unique_lot_sequence_user_symbol')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:40
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_sent(apps, schema_editor):
+    ClassActionLawsuit = apps.get_model('claim', 'ClassActionLawsuit')
+    ClassActionLawsuit.objects.filter(send_format=True).update(delivery_status='SENT')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claim', '0025_lotsequence'),
+        ('users', '0018_alter_customuser_options_alter_customuser_role_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classactionlawsuit',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='classactionlawsuit',
+            name='delivery_error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='classactionlawsuit',
+            name='delivery_status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('SENT', 'Sent'), ('FAILED', 'Failed')], default='PENDING', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='ClaimJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('claim_job_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('users_total', models.PositiveIntegerField(default=0)),
+                ('users_sent', models.PositiveIntegerField(default=0)),
+                ('users_failed', models.PositiveIntegerField(default=0)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('claim', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='claim_jobs', to='claim.claimaction')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='claim_jobs', to='users.company')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claim_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Claim Job',
+                'verbose_name_plural': 'Claim Jobs',
+            },
+        ),
+        migrations.RunPython(mark_sent, migrations.RunPython.noop),
+    ]
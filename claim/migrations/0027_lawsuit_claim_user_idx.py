@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claim', '0026_claimjob_lawsuit_delivery_status'),
+        ('users', '0018_alter_customuser_options_alter_customuser_role_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='classactionlawsuit',
+            index=models.Index(fields=['claim', 'company', 'user'], name='lawsuit_claim_user_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:30
+
+from django.contrib.postgres.fields import DateRangeField
+from django.contrib.postgres.indexes import GistIndex
+from django.db import migrations
+from django.db.models import Case, F, Func, Q, Value, When
+
+
+def eligibility_index():
+    return GistIndex(
+        F('company'),
+        F('symbol'),
+        Func(
+            F('start_date'),
+            Case(When(end_date__lt=F('start_date'), then=F('start_date')), default=F('end_date')),
+            Value('[]'),
+            function='daterange',
+            output_field=DateRangeField()
+        ),
+        name='holding_eligibility_gist_idx',
+        condition=Q(useless=False)
+    )
+
+
+def add_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # btree_gist lets company and symbol share the GiST index with the range.
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.add_index(apps.get_model('claim', 'ActionsHoldings'), eligibility_index())
+
+
+def remove_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('claim', 'ActionsHoldings'), eligibility_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claim', '0027_lawsuit_claim_user_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_index, remove_index),
+    ]
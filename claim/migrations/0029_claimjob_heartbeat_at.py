@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claim', '0028_holding_eligibility_gist_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='claimjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
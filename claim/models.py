@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth import get_user_model
 import uuid
 
@@ -62,8 +63,41 @@ class ActionsHoldings(models.Model):
     class Meta:
         verbose_name = 'Actions Holdings'
         verbose_name_plural = 'Actions Holdings'
+        indexes = [
+            models.Index(fields=['user', 'symbol', 'lot_number'], name='holding_user_symbol_lot_idx'),
+            models.Index(
+                fields=['user', 'symbol', 'lot_number'],
+                name='holding_open_lot_idx',
+                condition=Q(useless=False)
+            ),
+            models.Index(
+                fields=['company', 'symbol', 'start_date', 'end_date'],
+                name='holding_company_open_idx',
+                condition=Q(useless=False)
+            ),
+        ]
+
+class LotSequence(models.Model):
+    symbol = models.CharField(max_length=20, null=False, blank=False)
+    last_lot_number = models.IntegerField(null=False, blank=False, default=0)
+    user = models.ForeignKey(USER_MODEL, on_delete=models.CASCADE, related_name='lot_sequences')
+
+    def __str__(self) -> str:
+        return f"{self.symbol} - {self.last_lot_number}"
+
+    class Meta:
+        verbose_name = 'Lot Sequence'
+        verbose_name_plural = 'Lot Sequences'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'symbol'], name='unique_lot_sequence_user_symbol'),
+        ]
 
 class ClassActionLawsuit(models.Model):
+    class DeliveryStatusChoices(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        SENT = 'SENT', 'Sent'
+        FAILED = 'FAILED', 'Failed'
+
     batch_id = models.UUIDField(default=uuid.uuid4, db_index=True)
     tycker_symbol = models.CharField(max_length=255, null=True, blank=True)
     company_name = models.CharField(max_length=255, null=True, blank=True)
@@ -75,6 +109,9 @@ class ClassActionLawsuit(models.Model):
     send_format = models.BooleanField(default=False, null=False, blank=True)
     accept_claim = models.BooleanField(default=False, null=False, blank=True)
     register_payment = models.BooleanField(default=False, null=False, blank=True)
+    delivery_status = models.CharField(max_length=10, choices=DeliveryStatusChoices.choices, default=DeliveryStatusChoices.PENDING)
+    delivery_error = models.TextField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
     user = models.ForeignKey(USER_MODEL, blank=False, null=False, on_delete=models.CASCADE, related_name='class_actions_lawsuits')
     company = models.ForeignKey(Company,  null=True, blank=True, on_delete=models.CASCADE, related_name="class_actions_lawsuits")
     holding = models.ForeignKey(ActionsHoldings, null=True, blank=True, on_delete=models.CASCADE, related_name="class_actions_lawsuits")
@@ -86,16 +123,39 @@ class ClassActionLawsuit(models.Model):
     class Meta:
         verbose_name = "Class Action Lawsuit"
         verbose_name_plural = "Class Action Lawsuits"
+        indexes = [
+            models.Index(fields=['claim', 'company', 'user'], name='lawsuit_claim_user_idx'),
+        ]
 
 
 class ClaimActionTransaction(models.Model):
+    class ActivityChoices(models.TextChoices):
+        BUY = 'BUY', 'Buy'
+        INCOME = 'INCOME', 'Income'
+        SELL = 'SELL', 'Sell'
+        OTHER = 'OTHER', 'Other'
+
+        @classmethod
+        def normalize(cls, activity) -> str:
+            if activity is None:
+                return cls.OTHER
+            activity = str(activity).strip().upper()
+            if 'BUY' in activity:
+                return cls.BUY
+            if 'INCOME' in activity:
+                return cls.INCOME
+            if activity == 'SELL':
+                return cls.SELL
+            return cls.OTHER
+
     data_for = models.CharField(max_length=255, null=True, blank=True)
-    trade_date = models.CharField(max_length=30, null=True, blank=True)
+    trade_date = models.DateField(null=True, blank=True)
     account = models.CharField(max_length=255, null=True, blank=True)
     account_name = models.CharField(max_length=255, null=True, blank=True)
     account_type = models.CharField(max_length=10, null=True, blank=True)
     account_number = models.CharField(max_length=20, null=True, blank=True)
     activity = models.CharField(max_length=60, null=True, blank=True)
+    activity_code = models.CharField(max_length=10, choices=ActivityChoices.choices, default=ActivityChoices.OTHER)
     description = models.CharField(max_length=255, null=True, blank=True)
     symbol = models.CharField(max_length=20, null=True, blank=True)
     quantity = models.IntegerField(null=False, blank=False)
@@ -112,6 +172,10 @@ class ClaimActionTransaction(models.Model):
     class Meta:
         verbose_name = 'Claim Action Transaction'
         verbose_name_plural = 'Claim Action Transactions'
+        indexes = [
+            models.Index(fields=['user', 'symbol', 'trade_date'], name='transaction_user_symbol_idx'),
+            models.Index(fields=['user', '-trade_date', 'id'], name='transaction_user_date_idx'),
+        ]
 
 
 class ImportLog(models.Model):
@@ -133,3 +197,64 @@ class ImportLog(models.Model):
     class Meta:
         verbose_name = 'Import Log'
         verbose_name_plural = 'Import Logs'
+
+
+class ImportJob(models.Model):
+    class StatusChoices(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        DONE = 'DONE', 'Done'
+        FAILED = 'FAILED', 'Failed'
+
+    import_job_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    file = models.FileField(upload_to='imports/')
+    status = models.CharField(max_length=10, choices=StatusChoices.choices, default=StatusChoices.PENDING)
+    processed_rows = models.PositiveIntegerField(default=0)
+    successful_imports = models.PositiveIntegerField(default=0)
+    failed_imports = models.PositiveIntegerField(default=0)
+    warnings = models.JSONField(blank=True, null=True)
+    error_message = models.TextField(blank=True, null=True)
+    user = models.ForeignKey(USER_MODEL, on_delete=models.CASCADE, related_name='import_jobs')
+    requested_by = models.ForeignKey(USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='requested_import_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # Refreshed whenever a RUNNING job writes progress; a stale one has no worker left.
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Job {self.import_job_id} - {self.status}"
+
+    class Meta:
+        verbose_name = 'Import Job'
+        verbose_name_plural = 'Import Jobs'
+
+
+class ClaimJob(models.Model):
+    class StatusChoices(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        DONE = 'DONE', 'Done'
+        FAILED = 'FAILED', 'Failed'
+
+    claim_job_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    status = models.CharField(max_length=10, choices=StatusChoices.choices, default=StatusChoices.PENDING)
+    users_total = models.PositiveIntegerField(default=0)
+    users_sent = models.PositiveIntegerField(default=0)
+    users_failed = models.PositiveIntegerField(default=0)
+    error_message = models.TextField(blank=True, null=True)
+    claim = models.ForeignKey(ClaimAction, on_delete=models.CASCADE, related_name='claim_jobs')
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='claim_jobs')
+    requested_by = models.ForeignKey(USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='claim_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # Refreshed whenever a RUNNING job writes progress; a stale one has no worker left.
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Claim job {self.claim_job_id} - {self.status}"
+
+    class Meta:
+        verbose_name = 'Claim Job'
+        verbose_name_plural = 'Claim Jobs'
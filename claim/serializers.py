@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from django.db.models import Sum
 from users.serializers import UserSerializer
-from .models import ActionsHoldings, ClaimAction, ClaimActionTransaction, ImportLog, ClassActionLawsuit
+from .models import ActionsHoldings, ClaimAction, ClaimActionTransaction, ClaimJob, ImportJob, ImportLog, ClassActionLawsuit
 from django.contrib.auth import get_user_model
 
 USER_MODEL = get_user_model()
@@ -36,7 +36,7 @@ class FileUploadSerializer(serializers.Serializer):
     target_user_id = serializers.IntegerField(required=False, allow_null=True)
 
     def validate_file(self, value):
-        valid_extensions = ['csv', 'xlsx', 'xls']
+        valid_extensions = ['csv', 'xlsx']
         ext = value.name.split('.')[-1]
         if ext.lower() not in valid_extensions:
             raise serializers.ValidationError(f"Unsupported extension. Upload a file {', '.join(valid_extensions)}.")
@@ -83,7 +83,23 @@ class ClaimActionTransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = ClaimActionTransaction
         fields = '__all__'
-        read_only_fields = ('user', 'cost_per_stock')
+        read_only_fields = ('user', 'cost_per_stock', 'activity_code')
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = [
+            'import_job_id', 'status', 'processed_rows', 'successful_imports', 'failed_imports',
+            'warnings', 'error_message', 'user', 'created_at', 'started_at', 'finished_at'
+        ]
+
+class ClaimJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ClaimJob
+        fields = [
+            'claim_job_id', 'status', 'users_total', 'users_sent', 'users_failed',
+            'error_message', 'claim', 'created_at', 'started_at', 'finished_at'
+        ]
 
 class ImportLogSerializer(serializers.ModelSerializer):
     class Meta:
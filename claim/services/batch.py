@@ -0,0 +1,129 @@
+from collections import defaultdict
+from itertools import groupby
+from django.utils import timezone
+from archeota import settings
+from claim.models import ClaimAction, ClaimJob
+from claim.services.claim import ClaimDelivery, ClaimSevice
+from claim.services.holdings import HoldingService
+from users.models import Company
+
+
+class ClaimBatchService():
+    """
+    Processes many (claim, company) pairs in one run.
+
+    Each claim reads the eligible holdings of all its target companies with
+    a single streamed scan, and every claim of the run shares one delivery
+    pool, so the worker threads keep their warm report renderers and the
+    mail connection stays open from the first email to the last. Progress
+    is tracked with one ``ClaimJob`` per pair, as with the HTTP endpoint.
+    """
+    active_statuses = [ClaimJob.StatusChoices.PENDING, ClaimJob.StatusChoices.RUNNING]
+
+    def __init__(self, user, chunk_size: int | None = None):
+        self.user = user
+        self.chunk_size = chunk_size or settings.CLAIM_CHUNK_SIZE
+        self.holding_svc = HoldingService(self.user)
+
+    @staticmethod
+    def has_dates(claim: ClaimAction) -> bool:
+        return all(
+            value is not None and str(value).strip()
+            for value in (claim.start_eligibility_date, claim.final_eligibility_date)
+        )
+
+    @staticmethod
+    def targets(claims=None, companies=None) -> dict[ClaimAction, list[Company]]:
+        """
+        Pairs every claim with the companies to process it for. Without
+        ``companies`` a claim only targets its own company; without
+        ``claims`` every open claim of ``companies`` is taken. Claims
+        missing an eligibility date are left out.
+        """
+        targets: dict[ClaimAction, list[Company]] = defaultdict(list)
+        if claims is None:
+            claims = (ClaimAction.objects
+                      .filter(claimed=False, company__in=companies)
+                      .select_related('company')
+                      .order_by('id'))
+            for claim in claims:
+                if ClaimBatchService.has_dates(claim):
+                    targets[claim].append(claim.company)
+            return targets
+        for claim in claims:
+            if not ClaimBatchService.has_dates(claim):
+                continue
+            if companies is None:
+                if claim.company is not None:
+                    targets[claim].append(claim.company)
+            else:
+                targets[claim].extend(companies)
+        return targets
+
+    def __finish(self, job: ClaimJob, error: str | None = None):
+        job.status = ClaimJob.StatusChoices.FAILED if error else ClaimJob.StatusChoices.DONE
+        job.error_message = error
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error_message', 'finished_at'])
+
+    def __jobs(self, claim: ClaimAction, companies: list[Company]) -> dict[int, ClaimJob]:
+        busy = set(
+            ClaimJob.objects
+            .filter(claim=claim, company__in=companies, status__in=self.active_statuses)
+            .values_list('company_id', flat=True)
+        )
+        return {
+            company.pk: ClaimJob.objects.create(
+                claim=claim,
+                company=company,
+                requested_by=self.user,
+                status=ClaimJob.StatusChoices.RUNNING,
+                started_at=timezone.now(),
+                heartbeat_at=timezone.now()
+            )
+            for company in companies
+            if company.pk not in busy
+        }
+
+    def __process_claim(self, claim: ClaimAction, companies: list[Company], delivery: ClaimDelivery) -> list[ClaimJob]:
+        jobs = self.__jobs(claim, companies)
+        errors: dict[int, str] = {}
+        try:
+            allowed = []
+            for company in companies:
+                if company.pk not in jobs:
+                    continue
+                if ClaimSevice(self.user, company).can_process():
+                    allowed.append(company)
+                else:
+                    errors[company.pk] = "Error processing claim: Not allowed"
+
+            companies_by_id = {company.pk: company for company in allowed}
+            holdings = self.holding_svc.stream_companies_holdings(
+                allowed, claim.tycker_symbol, claim.start_eligibility_date, claim.final_eligibility_date, self.chunk_size
+            ) if allowed else ()
+            for company_id, company_holdings in groupby(holdings, key=lambda h: h.company_id):
+                svc = ClaimSevice(self.user, companies_by_id[company_id])
+                try:
+                    svc.process_holdings(claim, company_holdings, jobs[company_id], self.chunk_size, delivery)
+                except Exception as e:
+                    errors[company_id] = f"Error processing claim: {str(e)}"
+            delivery.drain()
+        except Exception as e:
+            # The shared scan failed: no job of this claim may stay RUNNING.
+            for company_id in jobs:
+                errors.setdefault(company_id, f"Error processing claim: {str(e)}")
+
+        for company_id, job in jobs.items():
+            self.__finish(job, errors.get(company_id))
+        if claim.company_id in jobs and claim.company_id not in errors:
+            claim.claimed = True
+            claim.save(update_fields=["claimed"])
+        return list(jobs.values())
+
+    def run(self, targets: dict[ClaimAction, list[Company]]) -> list[ClaimJob]:
+        jobs = []
+        with ClaimDelivery(ClaimSevice.record_results, flush_every=self.chunk_size) as delivery:
+            for claim, companies in targets.items():
+                jobs.extend(self.__process_claim(claim, companies, delivery))
+        return jobs
@@ -1,30 +1,159 @@
-from collections import defaultdict
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import timedelta
 from decimal import Decimal
+from itertools import groupby
 from django.core.mail import EmailMessage
 import uuid
-from django.core.mail import send_mail
+from django.utils import timezone
 from typing import Any
 from archeota import settings
-from claim.models import ActionsHoldings, ClaimAction, ClassActionLawsuit
+from archeota.jobs import BackgroundJobs
+from archeota.mail import MailDispatcher
+from claim.models import ActionsHoldings, ClaimAction, ClaimJob, ClassActionLawsuit
 from claim.services.holdings import HoldingService
 from claim.services.reporter import ClaimReporter
 from users.models import Company
 from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import Coalesce
+
+class ClaimDelivery():
+    """
+    Bounded fan-out of deliveries, each covering a few users whose reports
+    are rendered together and then sent one by one.
+
+    At most ``2 * workers`` deliveries are queued at once, so groups handed
+    over while holdings are still streaming never pile up in memory.
+    Delivery outcomes are buffered and handed to ``on_results`` in one go
+    every ``flush_every`` lawsuits, together with the counters of the jobs
+    they belong to. One delivery can be shared by several claims so the
+    worker threads (and their warm report renderers) and the mail
+    connection are reused across a whole run.
+    """
+    def __init__(self, on_results, workers: int | None = None, flush_every: int | None = None):
+        self.on_results = on_results
+        self.workers = workers or settings.CLAIM_DELIVERY_WORKERS
+        self.flush_every = flush_every or settings.CLAIM_CHUNK_SIZE
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='claim-delivery')
+        self.mailer = MailDispatcher()
+        self.pending: dict[Future, ClaimJob | None] = {}
+        self.jobs: dict[int, ClaimJob] = {}
+        self.sent: list[int] = []
+        self.failed: list[tuple[list[int], str]] = []
+        self.buffered = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self.drain()
+        finally:
+            self.pool.shutdown()
+            self.mailer.close()
+
+    def __collect(self, return_when):
+        if not self.pending:
+            return
+        done, _ = wait(self.pending, return_when=return_when)
+        for future in done:
+            job = self.pending.pop(future)
+            for ids, error in future.result():
+                if error is None:
+                    self.sent.extend(ids)
+                else:
+                    self.failed.append((ids, error))
+                if job is not None:
+                    if error is None:
+                        job.users_sent += 1
+                    else:
+                        job.users_failed += 1
+                    self.jobs[job.pk] = job
+                self.buffered += len(ids)
+        if self.buffered >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self.buffered:
+            self.on_results(self.sent, self.failed)
+        for job in self.jobs.values():
+            job.heartbeat_at = timezone.now()
+            job.save(update_fields=['users_sent', 'users_failed', 'heartbeat_at'])
+        self.jobs = {}
+        self.sent = []
+        self.failed = []
+        self.buffered = 0
+
+    def drain(self):
+        """Waits for every queued delivery and writes the outcomes."""
+        self.__collect(ALL_COMPLETED)
+        self.flush()
+
+    def submit(self, job: ClaimJob | None, fn, *args):
+        if len(self.pending) >= self.workers * 2:
+            self.__collect(FIRST_COMPLETED)
+        self.pending[self.pool.submit(BackgroundJobs.run, fn, *args, self.mailer)] = job
+
 
 class ClaimSevice():
+    batch_size = 1000
+    render_batch = settings.CLAIM_RENDER_BATCH
+
     def __init__(self, user, company: Company):
         self.user = user
         self.company = company
         self.holding_svc = HoldingService(self.user)
 
-    @transaction.atomic
-    def __save_bulk(self, bulk):
-        ClassActionLawsuit.objects.bulk_create(bulk)
+    @classmethod
+    def run_job(cls, job_pk):
+        claimed = (ClaimJob.objects
+                   .filter(pk=job_pk, status=ClaimJob.StatusChoices.PENDING)
+                   .update(status=ClaimJob.StatusChoices.RUNNING, started_at=timezone.now(), heartbeat_at=timezone.now()))
+        if not claimed:
+            return
+        job = ClaimJob.objects.select_related('claim', 'company', 'requested_by__profile').get(pk=job_pk)
+        try:
+            svc = cls(job.requested_by, job.company)
+            if job.claim.claimed:
+                svc.retry_failed(job.claim, job)
+            else:
+                svc.process_claim(job.claim, job)
+            job.claim.claimed = True
+            job.claim.save(update_fields=["claimed"])
+            job.status = ClaimJob.StatusChoices.DONE
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'finished_at'])
+        except Exception as e:
+            job.status = ClaimJob.StatusChoices.FAILED
+            job.error_message = f"Error processing claim: {str(e)}"
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'error_message', 'finished_at'])
+
+    @staticmethod
+    def requeue_stale(stale_after: int | None = None) -> int:
+        """
+        Moves back to PENDING the RUNNING jobs whose worker died: those with
+        no progress for ``stale_after`` seconds (``JOB_STALE_AFTER``). Jobs
+        still being run by a live worker keep beating and are left alone.
+        """
+        stale_after = settings.JOB_STALE_AFTER if stale_after is None else stale_after
+        return (ClaimJob.objects
+                .filter(status=ClaimJob.StatusChoices.RUNNING)
+                .alias(last_beat=Coalesce('heartbeat_at', 'started_at'))
+                .filter(last_beat__lt=timezone.now() - timedelta(seconds=stale_after))
+                .update(status=ClaimJob.StatusChoices.PENDING))
+
+    def can_process(self) -> bool:
+        return self.user.role == 'SUPER_ADMIN' or self.user.profile.company.id == self.company.id
 
     @transaction.atomic
-    def __create_class(self, claim: ClaimAction, holding: ActionsHoldings):
+    def __save_bulk(self, bulk: list[ClassActionLawsuit]) -> list[int]:
+        ClassActionLawsuit.objects.bulk_create(bulk, batch_size=self.batch_size)
+        return [c.pk for c in bulk]
+
+    def __create_class(self, claim: ClaimAction, holding: ActionsHoldings, batch_id: uuid.UUID):
         return ClassActionLawsuit(
-            batch_id = uuid.uuid4(),
+            batch_id = batch_id,
             tycker_symbol=holding.symbol,
             company_name=claim.company_name,
             quantity_stock=holding.quantity,
@@ -37,15 +166,42 @@ class ClaimSevice():
             holding=holding,
             claim=claim
         )
-    
-    @transaction.atomic
-    def __format_sent(self, batch_id: list[uuid.UUID]):
+
+    @staticmethod
+    def __format_sent(ids: list[int]):
         (ClassActionLawsuit.objects
-        .filter(batch_id__in=batch_id)
-        .update(send_format=True))
-    
-    def send_claim_email(self, user, claim: ClaimAction, holdings: list[ClassActionLawsuit]):
-        pdf = ClaimReporter.build_reporter(user, claim, holdings)
+        .filter(pk__in=ids)
+        .update(
+            send_format=True,
+            delivery_status=ClassActionLawsuit.DeliveryStatusChoices.SENT,
+            delivery_error=None,
+            delivered_at=timezone.now()
+        ))
+
+    @staticmethod
+    def __format_failed(ids: list[int], error: str):
+        (ClassActionLawsuit.objects
+        .filter(pk__in=ids)
+        .update(
+            delivery_status=ClassActionLawsuit.DeliveryStatusChoices.FAILED,
+            delivery_error=error
+        ))
+
+    @classmethod
+    @transaction.atomic
+    def record_results(cls, sent: list[int], failed: list[tuple[list[int], str]]):
+        if sent:
+            cls.__format_sent(sent)
+        by_error: dict[str, list[int]] = {}
+        for ids, error in failed:
+            by_error.setdefault(error, []).extend(ids)
+        for error, ids in by_error.items():
+            cls.__format_failed(ids, error)
+
+    def __send_report(self, user, claim: ClaimAction, holdings: list[ClassActionLawsuit], mailer: MailDispatcher | None = None,
+                      pdf: bytes | None = None):
+        if pdf is None:
+            pdf = ClaimReporter.build_reporter(user, claim, holdings)
         mail = EmailMessage(
             subject=f"Claim Action for {user.first_name} {user.last_name}",
             body="Archeota - Claim Action Report",
@@ -58,43 +214,147 @@ class ClaimSevice():
             content=pdf,
             mimetype="application/pdf"
         )
-        mail.send()
+        result = mailer.send(mail) if mailer is not None else MailDispatcher.send_one(mail)
+        if not result.sent:
+            raise Exception(result.error)
 
-        batch_ids = [h.batch_id for h in holdings]
-        self.__format_sent(batch_ids)
+    def __deliver(self, claim: ClaimAction, payload: list[tuple[Any, list[ClassActionLawsuit]]],
+                  mailer: MailDispatcher) -> list[tuple[list[int], str | None]]:
+        try:
+            pdfs = ClaimReporter.build_reporters((user, claim, classes) for user, classes in payload)
+        except Exception:
+            # Rendered again one by one so a broken report only fails its own user.
+            pdfs = [None] * len(payload)
+        results = []
+        for (user, holdings), pdf in zip(payload, pdfs):
+            ids = [h.pk for h in holdings]
+            try:
+                self.__send_report(user, claim, holdings, mailer, pdf)
+                results.append((ids, None))
+            except Exception as e:
+                results.append((ids, str(e)))
+        return results
 
-    def __send_handle(self, claim: ClaimAction, payload: dict[Any, list[ClassActionLawsuit]]):
+    def __send_handle(self, claim: ClaimAction, payload: list[tuple[Any, list[ClassActionLawsuit]]], job: ClaimJob | None, delivery: ClaimDelivery):
         method = str(claim.method_send_claim_format).strip().upper()
         match method:
             case "EMAIL":
-                for user, classes in payload.items():
-                    self.send_claim_email(
-                        user,
-                        claim,
-                        classes
-                    )
+                for start in range(0, len(payload), self.render_batch):
+                    delivery.submit(job, self.__deliver, claim, payload[start:start + self.render_batch])
                 return
             case _:
                 return
 
-    def process_claim(self, claim: ClaimAction):
-        if self.user.role != 'SUPER_ADMIN' and self.user.profile.company.id != self.company.id:
+    def __checkpoints(self, claim: ClaimAction) -> dict[int, bool]:
+        """Maps every user that already has lawsuits for the claim to whether all of them were sent."""
+        rows = (ClassActionLawsuit.objects
+                .filter(claim=claim, company=self.company)
+                .values('user_id')
+                .annotate(
+                    total=Count('id'),
+                    sent=Count('id', filter=Q(delivery_status=ClassActionLawsuit.DeliveryStatusChoices.SENT))
+                ))
+        return {row['user_id']: row['total'] == row['sent'] for row in rows}
+
+    def __resumed(self, claim: ClaimAction, user_ids: list[int],
+                  statuses: list[str] | None = None) -> list[tuple[Any, list[ClassActionLawsuit]]]:
+        lawsuits = (ClassActionLawsuit.objects
+                    .filter(claim=claim, company=self.company, user_id__in=user_ids)
+                    .select_related('user__profile', 'holding__company')
+                    .order_by('user_id', 'holding__start_date', 'holding_id'))
+        if statuses:
+            lawsuits = lawsuits.filter(delivery_status__in=statuses)
+        payload = []
+        for _, classes in groupby(lawsuits, key=lambda c: c.user_id):
+            classes = list(classes)
+            payload.append((classes[0].user, classes))
+        return payload
+
+    def __flush(self, claim: ClaimAction, payload: list[tuple[Any, list[ClassActionLawsuit]]], resumed: list[int], job: ClaimJob | None, delivery: ClaimDelivery,
+                statuses: list[str] | None = None):
+        if payload:
+            self.__save_bulk([c for _, classes in payload for c in classes])
+        if resumed:
+            payload = payload + self.__resumed(claim, resumed, statuses)
+        if job is not None:
+            job.users_total += len(payload)
+            job.heartbeat_at = timezone.now()
+            job.save(update_fields=['users_total', 'heartbeat_at'])
+        self.__send_handle(claim, payload, job, delivery)
+
+    def process_holdings(self, claim: ClaimAction, holdings, job: ClaimJob | None = None,
+                         chunk_size: int | None = None, delivery: ClaimDelivery | None = None):
+        """
+        Creates and delivers the lawsuits for ``holdings`` of this company,
+        which must come ordered by user. Lawsuits are inserted once
+        ``chunk_size`` rows are pending and the finished users are handed
+        to the delivery pool right away.
+
+        Every user's lawsuits share one ``batch_id`` and act as a checkpoint:
+        a rerun skips users whose lawsuits were all sent and resends the
+        existing lawsuits of the others instead of creating new ones.
+        """
+        if delivery is None:
+            with ClaimDelivery(self.record_results, flush_every=chunk_size) as delivery:
+                return self.process_holdings(claim, holdings, job, chunk_size, delivery)
+
+        chunk_size = chunk_size or settings.CLAIM_CHUNK_SIZE
+        checkpoints = self.__checkpoints(claim)
+        payload: list[tuple[Any, list[ClassActionLawsuit]]] = []
+        resumed: list[int] = []
+        pending = 0
+        for user_id, user_holdings in groupby(holdings, key=lambda h: h.user_id):
+            user_holdings = list(user_holdings)
+            sent = checkpoints.get(user_id)
+            if sent:
+                continue
+            if sent is None:
+                batch_id = uuid.uuid4()
+                payload.append((user_holdings[0].user, [self.__create_class(claim, holding, batch_id) for holding in user_holdings]))
+            else:
+                resumed.append(user_id)
+            pending += len(user_holdings)
+            if pending >= chunk_size:
+                self.__flush(claim, payload, resumed, job, delivery)
+                payload = []
+                resumed = []
+                pending = 0
+        if payload or resumed:
+            self.__flush(claim, payload, resumed, job, delivery)
+
+    def retry_failed(self, claim: ClaimAction, job: ClaimJob | None = None, delivery: ClaimDelivery | None = None):
+        """
+        Rerun of a claim that was already claimed: only the lawsuits whose
+        delivery failed are sent again. Holdings are not read, so no new
+        lawsuits are created and sent ones are left alone.
+        """
+        if not self.can_process():
+            raise Exception("Not allowed")
+        if delivery is None:
+            with ClaimDelivery(self.record_results) as delivery:
+                return self.retry_failed(claim, job, delivery)
+
+        failed = [ClassActionLawsuit.DeliveryStatusChoices.FAILED]
+        user_ids = list(
+            ClassActionLawsuit.objects
+            .filter(claim=claim, company=self.company, delivery_status__in=failed)
+            .order_by()
+            .values_list('user_id', flat=True)
+            .distinct()
+        )
+        if user_ids:
+            self.__flush(claim, [], user_ids, job, delivery, failed)
+
+    def process_claim(self, claim: ClaimAction, job: ClaimJob | None = None,
+                      chunk_size: int | None = None, delivery: ClaimDelivery | None = None):
+        """Streams the eligible holdings of the company through ``process_holdings``."""
+        if not self.can_process():
             raise Exception("Not allowed")
 
-        grouped_by_user: dict[Any, list[ClassActionLawsuit]] = defaultdict(list)
-        
+        chunk_size = chunk_size or settings.CLAIM_CHUNK_SIZE
         start_date = claim.start_eligibility_date
         end_date = claim.final_eligibility_date
-        company_holdings = self.holding_svc.company_holdings(self.company, claim.tycker_symbol, start_date, end_date)
-        for holding in company_holdings:
-            class_lawsuit = self.__create_class(claim, holding) 
-            grouped_by_user[holding.user].append(class_lawsuit)
-
-        for _, bulk in grouped_by_user.items():
-            self.__save_bulk(bulk)
-        
-        self.__send_handle(claim, grouped_by_user)
-        
-        
-        
-        
\ No newline at end of file
+        company_holdings = self.holding_svc.stream_company_holdings(
+            self.company, claim.tycker_symbol, start_date, end_date, chunk_size
+        )
+        self.process_holdings(claim, company_holdings, job, chunk_size, delivery)
@@ -0,0 +1,154 @@
+from datetime import date, datetime
+from django.contrib.postgres.fields import DateRangeField
+from django.db import connection
+from django.db.models import (
+    Case, Count, DateField, DecimalField, ExpressionWrapper, F, Func, OuterRef, Q, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Cast, Coalesce
+from django.utils.dateparse import parse_date
+from claim.models import ActionsHoldings, ClaimAction
+
+
+def eligibility_period(start='start_date', end='end_date') -> Func:
+    """
+    Closed ``daterange`` covered by a holding. Lots without an end date are
+    still open, so the range is unbounded above. Must stay in sync with the
+    ``holding_eligibility_gist_idx`` expression.
+    """
+    return Func(
+        F(start),
+        Case(When(**{f'{end}__lt': F(start)}, then=F(start)), default=F(end)),
+        Value('[]'),
+        function='daterange',
+        output_field=DateRangeField()
+    )
+
+
+def as_date(value) -> date | None:
+    """Claim dates are free text; returns ``None`` when they are not a valid date."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return parse_date(str(value).strip()) if value is not None else None
+    except ValueError:
+        return None
+
+
+def eligibility_window(start_date, end_date) -> Func | None:
+    """
+    Closed ``daterange`` of a claim, or ``None`` when either bound is not a
+    date or the window is inverted, which ``daterange`` would reject.
+    Expression bounds are used as given: the caller has validated them.
+    """
+    if hasattr(start_date, 'resolve_expression') or hasattr(end_date, 'resolve_expression'):
+        return Func(start_date, end_date, Value('[]'), function='daterange', output_field=DateRangeField())
+    start, end = as_date(start_date), as_date(end_date)
+    if start is None or end is None or start > end:
+        return None
+    return Func(Value(start), Value(end), Value('[]'), function='daterange', output_field=DateRangeField())
+
+
+def eligibility_q(start_date, end_date) -> Q:
+    """Holdings that overlap the eligibility window of a claim."""
+    return (
+        Q(
+            activity='Buy',
+            start_date__lte=end_date
+        ) & (
+            Q(end_date__gte=start_date) | Q(end_date__isnull=True)
+        )
+        |
+        Q(
+            activity='Sell',
+            start_date__lte=end_date,
+            end_date__gte=start_date
+        )
+    )
+
+
+def eligible_holdings(qs, start_date, end_date):
+    """
+    Applies the eligibility window to ``qs``. On PostgreSQL a valid window
+    is also expressed as a range overlap so the GiST index on
+    (company, symbol, period) drives the lookup; ``eligibility_q`` still
+    rechecks the exact bounds and is all that is applied otherwise.
+    """
+    qs = qs.filter(eligibility_q(start_date, end_date))
+    if connection.vendor == 'postgresql':
+        window = eligibility_window(start_date, end_date)
+        if window is not None:
+            qs = (qs
+                  .alias(eligibility_period=eligibility_period())
+                  .filter(eligibility_period__overlap=window))
+    return qs
+
+
+class EligibilityService():
+    """Matches claims against the open holdings of their company."""
+
+    def holdings(self, company, symbol, start_date, end_date):
+        return eligible_holdings(
+            ActionsHoldings.objects.filter(company=company, symbol=symbol, useless=False),
+            start_date,
+            end_date
+        )
+
+    def companies_holdings(self, companies, symbol, start_date, end_date):
+        return eligible_holdings(
+            ActionsHoldings.objects.filter(company__in=companies, symbol=symbol, useless=False),
+            start_date,
+            end_date
+        )
+
+    def __matched(self, value):
+        holdings = eligible_holdings(
+            ActionsHoldings.objects.filter(
+                company=OuterRef('company'),
+                symbol=OuterRef('tycker_symbol'),
+                useless=False
+            ),
+            Cast(OuterRef('start_eligibility_date'), DateField()),
+            Cast(OuterRef('final_eligibility_date'), DateField())
+        )
+        return Subquery(
+            holdings
+            .order_by()
+            .values('company')
+            .annotate(value=value)
+            .values('value')[:1]
+        )
+
+    def open_claims(self, companies=None):
+        """
+        Every open claim annotated with what it would produce: eligible
+        holdings, affected users, quantity and total exposure
+        (``quantity * value_per_share``), matched in a single query. Claims
+        whose eligibility dates are not a valid window are left out, since
+        the database could not cast them.
+        """
+        claims = ClaimAction.objects.filter(claimed=False, company__isnull=False)
+        if companies is not None:
+            claims = claims.filter(company__in=companies)
+        valid = [
+            pk for pk, start, end in claims.values_list('pk', 'start_eligibility_date', 'final_eligibility_date')
+            if eligibility_window(start, end) is not None
+        ]
+        return (
+            ClaimAction.objects
+            .filter(pk__in=valid)
+            .select_related('company')
+            .annotate(
+                holdings_count=Coalesce(self.__matched(Count('id')), 0),
+                users_count=Coalesce(self.__matched(Count('user', distinct=True)), 0),
+                quantity_total=Coalesce(self.__matched(Sum('quantity')), 0),
+            )
+            .annotate(
+                exposure=ExpressionWrapper(
+                    F('quantity_total') * F('value_per_share'),
+                    output_field=DecimalField(max_digits=24, decimal_places=4)
+                )
+            )
+            .order_by('-exposure', 'id')
+        )
@@ -0,0 +1,163 @@
+from datetime import timedelta
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from archeota import settings
+from claim.models import ImportJob, ImportLog
+from claim.services.stock import FileStockHandler
+from claim.services.transaction import TransactionService
+
+
+class ImportService():
+    batch_size = 1000
+
+    def __init__(self, job: ImportJob):
+        self.job = job
+        self.user = job.user
+        self.transaction_svc = TransactionService(user=self.user, company_profile=self.user.profile.company)
+        self.errors: list[ImportLog] = []
+
+    @classmethod
+    def run_job(cls, job_pk):
+        claimed = (ImportJob.objects
+                   .filter(pk=job_pk, status=ImportJob.StatusChoices.PENDING)
+                   .update(status=ImportJob.StatusChoices.RUNNING, started_at=timezone.now(), heartbeat_at=timezone.now()))
+        if not claimed:
+            return
+        job = ImportJob.objects.select_related('user__profile__company').get(pk=job_pk)
+        try:
+            cls(job).run()
+        except Exception as e:
+            job.status = ImportJob.StatusChoices.FAILED
+            job.error_message = f"Error processing file: {str(e)}"
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'error_message', 'finished_at'])
+        finally:
+            cls.discard_file(job)
+
+    @staticmethod
+    def discard_file(job: ImportJob):
+        """
+        The uploaded statement is only needed while the job runs; client
+        trade files are not kept once it has finished.
+        """
+        if job.file:
+            job.file.delete(save=False)
+            job.save(update_fields=['file'])
+
+    @classmethod
+    def requeue_running(cls, stale_after: int | None = None) -> tuple[int, int]:
+        """
+        Recovers jobs left RUNNING by a worker that died, i.e. with no
+        progress for ``stale_after`` seconds (``JOB_STALE_AFTER``). Imports
+        are not resumable, so only jobs that had not inserted any
+        transaction go back to PENDING (their partial error log is
+        dropped); the rest are failed and have to be uploaded again.
+        Returns (requeued, failed).
+        """
+        stale_after = settings.JOB_STALE_AFTER if stale_after is None else stale_after
+        running = (ImportJob.objects
+                   .filter(status=ImportJob.StatusChoices.RUNNING)
+                   .alias(last_beat=Coalesce('heartbeat_at', 'started_at'))
+                   .filter(last_beat__lt=timezone.now() - timedelta(seconds=stale_after)))
+        restartable = list(running.filter(successful_imports=0).values_list('import_job_id', flat=True))
+        ImportLog.objects.filter(import_job_id__in=restartable).delete()
+        requeued = (ImportJob.objects
+                    .filter(import_job_id__in=restartable, status=ImportJob.StatusChoices.RUNNING)
+                    .update(status=ImportJob.StatusChoices.PENDING, processed_rows=0, failed_imports=0, started_at=None))
+
+        failed = 0
+        for job in running.exclude(import_job_id__in=restartable):
+            job.status = ImportJob.StatusChoices.FAILED
+            job.error_message = "The import was interrupted after inserting rows; upload the file again."
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'error_message', 'finished_at'])
+            cls.discard_file(job)
+            failed += 1
+        return requeued, failed
+
+    def __log_error(self, row_number, row, error):
+        self.errors.append(ImportLog(
+            import_job_id=self.job.import_job_id,
+            status=ImportLog.StatusChoices.ERROR,
+            row_number=row_number,
+            error_message=str(error),
+            row_data=[str(value) if value is not None else None for value in row],
+            user=self.job.requested_by or self.user
+        ))
+
+    def __save_progress(self):
+        if self.errors:
+            ImportLog.objects.bulk_create(self.errors)
+            self.errors = []
+        self.job.heartbeat_at = timezone.now()
+        self.job.save(update_fields=['processed_rows', 'successful_imports', 'failed_imports', 'heartbeat_at'])
+
+    def __insert(self, objects):
+        self.transaction_svc.insert_objects(objects)
+        self.job.successful_imports += len(objects)
+        objects.clear()
+        self.__save_progress()
+
+    def run(self):
+        warnings_imports = {}
+        with self.job.file.open('rb') as file_obj:
+            file_svc = FileStockHandler(file_obj)
+        try:
+            for error in file_svc.errors:
+                self.job.processed_rows += 1
+                self.job.failed_imports += 1
+                self.__log_error(error.row_number, error.row_data, error.message)
+
+            objects = []
+            oldest_symbols = file_svc.oldest_symbols()
+            invalid = self.transaction_svc.validate_oldest_buys(
+                {symbol: row.activity for symbol, row in oldest_symbols.items()}
+            )
+            symbols = []
+            for symbol in oldest_symbols:
+                if symbol in invalid:
+                    warnings_imports[symbol] = "There is no initial purchase for this symbol"
+                    continue
+                symbols.append(symbol)
+
+            for row in file_svc.rows_by_symbols(symbols):
+                self.job.processed_rows += 1
+                try:
+                    obj = self.transaction_svc.create_instance(
+                        data_for=row.data_for,
+                        trade_date=row.trade_date,
+                        account=row.account,
+                        account_name=row.account_name,
+                        account_type=row.account_type,
+                        account_number=row.account_number,
+                        activity=row.activity,
+                        description=row.description,
+                        symbol=row.symbol,
+                        quantity=row.quantity,
+                        cost_per_stock=row.cost_per_stock,
+                        amount=row.amount,
+                        notes=row.notes
+                    )
+                    objects.append(obj)
+                    if len(objects) >= self.batch_size:
+                        self.__insert(objects)
+
+                except Exception as e:
+                    self.job.failed_imports += 1
+                    self.__log_error(row.row_number, row[1:], e)
+
+            if objects:
+                self.__insert(objects)
+        finally:
+            file_svc.close()
+
+        warnings_process = self.transaction_svc.process_bulk()
+
+        self.__save_progress()
+        self.job.status = ImportJob.StatusChoices.DONE
+        self.job.warnings = {
+            "warnings_imports": warnings_imports,
+            "warnings_process": warnings_process
+        }
+        self.job.finished_at = timezone.now()
+        self.job.save(update_fields=['status', 'warnings', 'finished_at'])
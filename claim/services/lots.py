@@ -0,0 +1,221 @@
+from collections import deque
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Q
+from claim.models import ClaimActionTransaction, ActionsHoldings, LotSequence
+from claim.services.preview import bump_holdings_version
+
+
+def buy_filter(buy_activities: list[str]) -> Q:
+    q_filter = Q()
+    for act in buy_activities:
+        if '.*' in act:
+            q_filter |= Q(activity__iregex=act)
+        else:
+            q_filter |= Q(activity__icontains=act)
+    return q_filter
+
+
+class LotAllocator():
+    """
+    Hands out contiguous lot numbers per (user, symbol) from the LotSequence
+    counter row, locked with ``select_for_update`` so concurrent imports
+    never reuse a number. The counter is seeded from the holdings the first
+    time a symbol is seen.
+    """
+    def __init__(self, user, buy_activities: list[str]):
+        self.user = user
+        self.buy_activities = buy_activities
+
+    def __last_lot_number(self, symbol) -> int:
+        last = (ActionsHoldings.objects
+                .filter(user=self.user, symbol=symbol)
+                .filter(buy_filter(self.buy_activities))
+                .aggregate(last=Max('lot_number'))['last'])
+        return last or 0
+
+    @transaction.atomic
+    def reserve(self, symbol, count: int) -> int:
+        """Reserves ``count`` lot numbers and returns the first one."""
+        sequence = (LotSequence.objects
+                    .select_for_update()
+                    .filter(user=self.user, symbol=symbol)
+                    .first())
+        if sequence is None:
+            try:
+                with transaction.atomic():
+                    sequence = LotSequence.objects.create(
+                        user=self.user,
+                        symbol=symbol,
+                        last_lot_number=self.__last_lot_number(symbol)
+                    )
+            except IntegrityError:
+                sequence = LotSequence.objects.select_for_update().get(user=self.user, symbol=symbol)
+        first = sequence.last_lot_number + 1
+        sequence.last_lot_number += count
+        sequence.save(update_fields=['last_lot_number'])
+        return first
+
+
+class LotEngine():
+    """
+    FIFO lot matcher for one (user, symbol).
+
+    Open lots are loaded once into an ordered queue, every buy and sell is
+    applied in memory and ``flush`` writes the resulting rows with a single
+    ``bulk_create`` plus a single ``bulk_update``.
+    """
+    def __init__(self, user, symbol, buy_activities: list[str]):
+        self.user = user
+        self.symbol = str(symbol).strip()
+        self.buy_activities = buy_activities
+        self.company = self.user.profile.company
+        self.lots: deque[ActionsHoldings] = deque()
+        self.created: list[ActionsHoldings] = []
+        self.retired: list[ActionsHoldings] = []
+        self.allocator = LotAllocator(self.user, self.buy_activities)
+        self.next_lot_number = 0
+        self.reserved_until = 0
+        self.__load()
+
+    def __load(self):
+        self.lots.extend(
+            ActionsHoldings.objects
+            .filter(user=self.user, symbol=self.symbol, useless=False)
+            .filter(buy_filter(self.buy_activities))
+            .order_by('lot_number', 'id')
+        )
+
+    def reserve(self, count: int):
+        """Reserves lot numbers for the next ``count`` buys in one statement."""
+        if count > 0:
+            self.next_lot_number = self.allocator.reserve(self.symbol, count)
+            self.reserved_until = self.next_lot_number + count
+
+    def __holding(self, lot: ActionsHoldings, **fields) -> ActionsHoldings:
+        return ActionsHoldings(
+            lot_number=lot.lot_number,
+            start_date=lot.start_date,
+            cost_per_stock=lot.cost_per_stock,
+            user=self.user,
+            company=self.company,
+            **fields
+        )
+
+    def __finished(self, lot: ActionsHoldings, selling: ActionsHoldings, quantity) -> ActionsHoldings:
+        return self.__holding(
+            lot,
+            name=f"LOT{lot.lot_number:05d}_FINISHED",
+            end_date=selling.end_date,
+            activity=selling.activity,
+            symbol=selling.symbol,
+            quantity=lot.quantity,
+            amount=(lot.cost_per_stock*Decimal(quantity)),
+        )
+
+    def __discounted(self, lot: ActionsHoldings, selling: ActionsHoldings, quantity) -> ActionsHoldings:
+        return self.__holding(
+            lot,
+            name=f"LOT{lot.lot_number:05d}_DISCOUNTED",
+            end_date=selling.end_date,
+            activity=selling.activity,
+            symbol=selling.symbol,
+            quantity=quantity,
+            amount=(lot.cost_per_stock*Decimal(quantity)),
+        )
+
+    def __remaining(self, lot: ActionsHoldings, selling: ActionsHoldings, quantity) -> ActionsHoldings:
+        return self.__holding(
+            lot,
+            name=f"LOT{lot.lot_number:05d}",
+            activity=lot.activity,
+            symbol=selling.symbol,
+            quantity=quantity,
+            amount=(lot.cost_per_stock*Decimal(quantity)),
+        )
+
+    def buy(self, claim: ClaimActionTransaction):
+        if self.next_lot_number >= self.reserved_until:
+            self.reserve(1)
+        lot_number = self.next_lot_number
+        self.next_lot_number += 1
+        holding = ActionsHoldings(
+            lot_number=lot_number,
+            name=f"LOT{lot_number:05d}",
+            start_date=claim.trade_date,
+            symbol=claim.symbol,
+            quantity=claim.quantity,
+            amount=claim.amount,
+            activity=claim.activity,
+            cost_per_stock=claim.cost_per_stock,
+            user=self.user,
+            company=self.company
+        )
+        self.lots.append(holding)
+        self.created.append(holding)
+
+    def sell(self, claim: ClaimActionTransaction):
+        """
+        Discounts ``claim`` from the oldest open lots. Nothing is applied when
+        the open lots cannot cover the sale, mirroring the rollback of the
+        previous per-row implementation.
+        """
+        if not self.lots:
+            raise Exception(f"There are not enough funds to apply the discount. {claim.activity} on {claim.trade_date}")
+        first_buy = self.lots[0]
+        selling = ActionsHoldings(
+            lot_number=first_buy.lot_number,
+            end_date=claim.trade_date,
+            symbol=claim.symbol,
+            quantity=claim.quantity,
+            amount=claim.amount,
+            activity=claim.activity,
+            cost_per_stock=claim.cost_per_stock,
+            user=self.user,
+            company=self.company
+        )
+        rows = [selling]
+        consumed = 1
+        remaining = None
+        quantity_left = first_buy.quantity - selling.quantity
+        if quantity_left < 0:
+            while quantity_left < 0:
+                rows.append(self.__finished(first_buy, selling, selling.quantity))
+                if consumed >= len(self.lots):
+                    raise Exception(f"There are not enough funds to apply the discount. {claim.activity} on {claim.trade_date}")
+                first_buy = self.lots[consumed]
+                consumed += 1
+                if first_buy.quantity > abs(quantity_left):
+                    rows.append(self.__discounted(first_buy, selling, abs(quantity_left)))
+                quantity_left = first_buy.quantity - abs(quantity_left)
+            if quantity_left == 0:
+                rows.append(self.__finished(first_buy, selling, first_buy.quantity))
+            else:
+                remaining = self.__remaining(first_buy, selling, quantity_left)
+        elif quantity_left == 0:
+            rows.append(self.__finished(first_buy, selling, first_buy.quantity))
+        else:
+            rows.append(self.__discounted(first_buy, selling, selling.quantity))
+            remaining = self.__remaining(first_buy, selling, quantity_left)
+
+        for _ in range(consumed):
+            lot = self.lots.popleft()
+            lot.useless = True
+            if lot.pk is not None:
+                self.retired.append(lot)
+        if remaining is not None:
+            rows.append(remaining)
+            self.lots.appendleft(remaining)
+        self.created.extend(rows)
+
+    @transaction.atomic
+    def flush(self):
+        if self.retired:
+            ActionsHoldings.objects.bulk_update(self.retired, ['useless'])
+        if self.created:
+            ActionsHoldings.objects.bulk_create(self.created)
+        if self.retired or self.created:
+            company_id, symbol = self.company.pk, self.symbol
+            transaction.on_commit(lambda: bump_holdings_version(company_id, symbol))
+        self.retired = []
+        self.created = []
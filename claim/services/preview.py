@@ -0,0 +1,94 @@
+import hashlib
+import uuid
+from decimal import Decimal
+from django.core.cache import caches
+from django.db.models import Count, DecimalField, ExpressionWrapper, Sum, Value
+from archeota import settings
+from claim.models import ClaimAction
+from claim.services.eligibility import EligibilityService
+
+
+def preview_cache():
+    return caches['claim_preview']
+
+
+def holdings_version_key(company_id, symbol) -> str:
+    return f"holdings-version:{company_id}:{str(symbol).strip()}"
+
+
+def holdings_version(company_id, symbol) -> str:
+    return preview_cache().get_or_set(holdings_version_key(company_id, symbol), uuid.uuid4().hex, None)
+
+
+def bump_holdings_version(company_id, symbol):
+    preview_cache().set(holdings_version_key(company_id, symbol), uuid.uuid4().hex, None)
+
+
+class ClaimPreviewService():
+    """
+    Dry run of a claim: what ``process_claim`` would create, aggregated per
+    user in the database, without writing lawsuits or sending anything.
+    Results are cached per claim and holdings version, which ``LotEngine``
+    bumps whenever it writes holdings for the company and symbol.
+    """
+    def __init__(self, claim: ClaimAction, company=None):
+        self.claim = claim
+        self.company_id = company.pk if company is not None else claim.company_id
+
+    def __key(self) -> str:
+        claim = self.claim
+        fingerprint = hashlib.sha256(
+            "|".join(str(v) for v in (
+                self.company_id,
+                claim.tycker_symbol,
+                claim.start_eligibility_date,
+                claim.final_eligibility_date,
+                claim.value_per_share,
+            )).encode('utf-8')
+        ).hexdigest()
+        version = holdings_version(self.company_id, claim.tycker_symbol)
+        return f"claim-preview:{claim.pk}:{fingerprint}:{version}"
+
+    def __users(self) -> list[dict]:
+        claim = self.claim
+        return list(
+            EligibilityService()
+            .holdings(self.company_id, claim.tycker_symbol, claim.start_eligibility_date, claim.final_eligibility_date)
+            .values('user_id', 'user__email', 'user__first_name', 'user__last_name')
+            .annotate(
+                holdings_count=Count('id'),
+                quantity_total=Sum('quantity'),
+                exposure=ExpressionWrapper(
+                    Sum('quantity') * Value(claim.value_per_share),
+                    output_field=DecimalField(max_digits=24, decimal_places=4)
+                )
+            )
+            .order_by('-exposure', 'user_id')
+        )
+
+    def build(self) -> dict:
+        users = [
+            {
+                'user_id': row['user_id'],
+                'email': row['user__email'],
+                'first_name': row['user__first_name'],
+                'last_name': row['user__last_name'],
+                'holdings': row['holdings_count'],
+                'quantity': row['quantity_total'],
+                'exposure': row['exposure'],
+            }
+            for row in self.__users()
+        ]
+        return {
+            'claim_id': self.claim.pk,
+            'symbol': self.claim.tycker_symbol,
+            'value_per_share': self.claim.value_per_share,
+            'users_count': len(users),
+            'holdings_count': sum(u['holdings'] for u in users),
+            'quantity_total': sum(u['quantity'] for u in users),
+            'exposure_total': sum((u['exposure'] for u in users), Decimal(0)),
+            'users': users,
+        }
+
+    def preview(self) -> dict:
+        return preview_cache().get_or_set(self.__key(), self.build, settings.CLAIM_PREVIEW_CACHE_TIMEOUT)
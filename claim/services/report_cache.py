@@ -0,0 +1,149 @@
+import hashlib
+import os
+import threading
+import time
+from datetime import timedelta
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.utils import timezone
+from archeota import settings
+
+
+class ReportCache():
+    """
+    Content addressed store for rendered claim PDFs.
+
+    Reports are saved under the sha256 of the rendered HTML, so an
+    unchanged claim/user pair is served from a file read instead of a new
+    layout pass. The PDFs carry client data, so they live on the private
+    ``report_cache`` storage (``REPORT_CACHE_ROOT``, outside ``MEDIA_ROOT``
+    and never served) and are kept for at most ``REPORT_CACHE_TTL`` seconds
+    after rendering: older files are misses on read and are deleted by
+    ``evict`` (also run by the ``purge_report_cache`` command).
+
+    A hit touches the file's access time, and once the running size of the
+    directory passes ``REPORT_CACHE_MAX_BYTES`` the least recently used
+    files are evicted down to ``low_watermark`` of the budget. The size is
+    resynchronised with a directory scan every ``REPORT_CACHE_SCAN_EVERY``
+    writes to account for what other workers stored.
+    """
+    location = 'claims'
+    suffix = '.pdf'
+    low_watermark = 0.9
+
+    _sizes: dict[str, int] = {}
+    _writes: dict[str, int] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, storage=None, location: str | None = None, max_bytes: int | None = None,
+                 scan_every: int | None = None, ttl: int | None = None):
+        self.storage = storage or storages['report_cache']
+        self.location = (location or self.location).strip('/')
+        self.max_bytes = settings.REPORT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.scan_every = settings.REPORT_CACHE_SCAN_EVERY if scan_every is None else scan_every
+        self.ttl = settings.REPORT_CACHE_TTL if ttl is None else ttl
+
+    @staticmethod
+    def key(*parts: str | bytes) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode('utf-8') if isinstance(part, str) else part)
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def __path(self, key: str) -> str:
+        return f"{self.location}/{key}{self.suffix}"
+
+    def __expired(self, modified) -> bool:
+        return bool(self.ttl) and modified < timezone.now() - timedelta(seconds=self.ttl)
+
+    def __accessed(self, path: str):
+        try:
+            return self.storage.get_accessed_time(path)
+        except NotImplementedError:
+            return self.storage.get_modified_time(path)
+
+    def __touch(self, path: str):
+        """Marks a hit by moving the access time, keeping the rendered time in mtime."""
+        try:
+            local = os.fspath(self.storage.path(path))
+            os.utime(local, (time.time(), os.stat(local).st_mtime))
+        except (NotImplementedError, OSError):
+            pass
+
+    def get(self, key: str) -> bytes | None:
+        path = self.__path(key)
+        try:
+            if self.__expired(self.storage.get_modified_time(path)):
+                self.storage.delete(path)
+                return None
+            with self.storage.open(path, 'rb') as cached:
+                pdf = cached.read()
+        except (FileNotFoundError, OSError):
+            return None
+        self.__touch(path)
+        return pdf
+
+    def set(self, key: str, pdf: bytes):
+        path = self.__path(key)
+        if self.storage.exists(path):
+            return
+        saved = self.storage.save(path, ContentFile(pdf))
+        if saved != path:
+            # Another worker stored the same report first.
+            self.storage.delete(saved)
+            return
+        if not self.max_bytes:
+            return
+        with self._lock:
+            size = self._sizes.get(self.location)
+            writes = self._writes.get(self.location, 0) + 1
+            self._writes[self.location] = writes
+            if size is not None:
+                size += len(pdf)
+                self._sizes[self.location] = size
+            scan = size is None or size > self.max_bytes or (self.scan_every and writes % self.scan_every == 0)
+        if scan:
+            self.evict()
+
+    def evict(self):
+        """
+        Scans the directory, deletes the expired files and then the least
+        recently used ones while it is over the budget, and records the
+        resulting size.
+        """
+        if not self.max_bytes and not self.ttl:
+            return
+        try:
+            _, files = self.storage.listdir(self.location)
+        except FileNotFoundError:
+            files = []
+        entries = []
+        total = 0
+        for name in files:
+            if not name.endswith(self.suffix):
+                continue
+            path = f"{self.location}/{name}"
+            try:
+                size = self.storage.size(path)
+                if self.__expired(self.storage.get_modified_time(path)):
+                    self.storage.delete(path)
+                    continue
+                accessed = self.__accessed(path)
+            except (FileNotFoundError, OSError):
+                continue
+            entries.append((accessed, path, size))
+            total += size
+        if self.max_bytes and total > self.max_bytes:
+            target = self.max_bytes * self.low_watermark
+            entries.sort()
+            for _, path, size in entries:
+                if total <= target:
+                    break
+                try:
+                    self.storage.delete(path)
+                except OSError:
+                    continue
+                total -= size
+        with self._lock:
+            self._sizes[self.location] = total
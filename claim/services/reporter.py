@@ -1,11 +1,85 @@
-from weasyprint import HTML
+import hashlib
+import mimetypes
+import threading
+from pathlib import Path
+from typing import Iterable
+from weasyprint import CSS, HTML, default_url_fetcher
+from weasyprint.text.fonts import FontConfiguration
 from archeota import settings
 from claim.models import ClaimAction, ClassActionLawsuit
-from django.template.loader import render_to_string
+from claim.services.report_cache import ReportCache
+from django.template.loader import get_template
 
-class ClaimReporter():
-    def build_reporter(user, claim: ClaimAction, classes: list[ClassActionLawsuit]) -> bytes:
-        context = {
+
+class ReportRenderer():
+    """
+    Warm WeasyPrint context for claim reports.
+
+    The template, the report stylesheet and the font configuration are
+    loaded once per thread and reused for every render. Assets under
+    ``claim/static/claim`` are served from memory by ``url_fetcher`` so
+    layout never goes to the network for them.
+    """
+    template_name = "claim.html"
+    stylesheet_name = "report.css"
+    assets_dir = Path(__file__).resolve().parent.parent / "static" / "claim"
+
+    _local = threading.local()
+
+    def __init__(self):
+        self.template = get_template(self.template_name)
+        self.base_url = self.assets_dir.as_uri() + "/"
+        self.assets: dict[Path, bytes] = {}
+        self.font_config = FontConfiguration()
+        stylesheet = self.__read(self.assets_dir / self.stylesheet_name)
+        self.stylesheets = [
+            CSS(
+                string=stylesheet.decode("utf-8"),
+                base_url=self.base_url,
+                url_fetcher=self.url_fetcher,
+                font_config=self.font_config
+            )
+        ]
+        self.version = hashlib.sha256(stylesheet).hexdigest()
+
+    @classmethod
+    def current(cls) -> "ReportRenderer":
+        renderer = getattr(cls._local, "renderer", None)
+        if renderer is None:
+            renderer = cls._local.renderer = cls()
+        return renderer
+
+    def __read(self, path: Path) -> bytes:
+        data = self.assets.get(path)
+        if data is None:
+            data = self.assets[path] = path.read_bytes()
+        return data
+
+    def __local_path(self, url: str) -> Path | None:
+        prefixes = [self.base_url]
+        if settings.SITE_URL:
+            prefixes.append(f"{settings.SITE_URL.rstrip('/')}/{settings.STATIC_URL.strip('/')}/claim/")
+        for prefix in prefixes:
+            if url.startswith(prefix):
+                path = (self.assets_dir / url[len(prefix):].split("?")[0]).resolve()
+                if path.is_relative_to(self.assets_dir) and path.is_file():
+                    return path
+        return None
+
+    def url_fetcher(self, url: str, *args, **kwargs) -> dict:
+        path = self.__local_path(url)
+        if path is None:
+            return default_url_fetcher(url, *args, **kwargs)
+        return {
+            "string": self.__read(path),
+            "mime_type": mimetypes.guess_type(path.name)[0],
+            "filename": path.name,
+            "redirected_url": url,
+        }
+
+    @staticmethod
+    def context(user, claim: ClaimAction, classes: list[ClassActionLawsuit]) -> dict:
+        return {
             "company": claim.company_name,
             "law_firm": claim.law_firm_handing_case,
             "client": {
@@ -29,13 +103,36 @@ class ClaimReporter():
             "stocks": classes
         }
 
-        html = render_to_string(
-            "claim.html",
-            context
-        )
+    def html(self, user, claim: ClaimAction, classes: list[ClassActionLawsuit]) -> str:
+        return self.template.render(self.context(user, claim, classes))
 
-        pdf = HTML(
+    def write_pdf(self, html: str) -> bytes:
+        return HTML(
             string=html,
-            base_url=settings.SITE_URL
-        ).write_pdf()
-        return pdf
\ No newline at end of file
+            base_url=self.base_url,
+            url_fetcher=self.url_fetcher
+        ).write_pdf(stylesheets=self.stylesheets, font_config=self.font_config)
+
+    def render(self, user, claim: ClaimAction, classes: list[ClassActionLawsuit]) -> bytes:
+        return self.write_pdf(self.html(user, claim, classes))
+
+
+class ClaimReporter():
+    def build_reporter(user, claim: ClaimAction, classes: list[ClassActionLawsuit]) -> bytes:
+        return ClaimReporter.build_reporters([(user, claim, classes)])[0]
+
+    def build_reporters(items: Iterable[tuple]) -> list[bytes]:
+        """Renders the reports of many (user, claim, classes) in one warm context."""
+        renderer = ReportRenderer.current()
+        cache = ReportCache() if settings.REPORT_CACHE_ENABLED else None
+        pdfs = []
+        for user, claim, classes in items:
+            html = renderer.html(user, claim, classes)
+            key = ReportCache.key(html, renderer.version)
+            pdf = cache.get(key) if cache is not None else None
+            if pdf is None:
+                pdf = renderer.write_pdf(html)
+                if cache is not None:
+                    cache.set(key, pdf)
+            pdfs.append(pdf)
+        return pdfs
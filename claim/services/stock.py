@@ -1,52 +1,225 @@
+import codecs
+import csv
+import datetime
+import os
+import pickle
+import tempfile
+from decimal import Decimal, InvalidOperation
+from typing import Iterator, NamedTuple
+from dateutil import parser as date_parser
 from openpyxl import load_workbook
+from archeota import settings
 
-class FileStockHandler():
-    def __init__(self, file):    
+
+class StockRow(NamedTuple):
+    row_number: int
+    data_for: str | None
+    trade_date: datetime.date
+    account: str | None
+    account_name: str | None
+    account_type: str | None
+    account_number: str | None
+    activity: str | None
+    description: str | None
+    symbol: str
+    quantity: int | Decimal
+    amount: Decimal
+    notes: str | None
+
+    @property
+    def cost_per_stock(self) -> Decimal:
+        return self.amount / Decimal(self.quantity)
+
+
+class RowError(NamedTuple):
+    row_number: int
+    message: str
+    row_data: list
+
+
+class XlsxStockReader():
+    def __init__(self, file):
         self.wb = load_workbook(file, read_only=True)
-        self.ws = self.wb.active
+
+    def rows(self) -> Iterator[tuple]:
+        return self.wb.active.iter_rows(values_only=True)
+
+    def close(self):
+        self.wb.close()
+
+
+class CsvStockReader():
+    def __init__(self, file, encoding='utf-8-sig'):
+        self.file = file
+        self.encoding = encoding
+
+    def rows(self) -> Iterator[tuple]:
+        lines = iter(self.file)
+        first = next(lines, b'')
+        if isinstance(first, bytes):
+            lines = codecs.iterdecode(lines, self.encoding)
+            first = first.decode(self.encoding)
+        try:
+            dialect = csv.Sniffer().sniff(first, delimiters=',;\t|')
+        except csv.Error:
+            dialect = csv.excel
+        header = [h.strip() for h in next(csv.reader([first], dialect))]
+        yield tuple(header)
+        for row in csv.reader(lines, dialect):
+            yield tuple(row)
+
+    def close(self):
+        pass
+
+
+class FileStockHandler():
+    """
+    Reads a transactions sheet (xlsx or csv) in a single pass.
+
+    Every row is typed and validated once. Valid rows are buffered in a
+    spooled temp file that moves to disk past ``IMPORT_SPILL_THRESHOLD``
+    bytes, while the oldest row of each symbol is tracked on the fly.
+    """
+    columns = {
+        'data_for': 'Data For',
+        'trade_date': 'Trade Date',
+        'account': 'Account',
+        'account_name': 'Account Name',
+        'account_type': 'Account Type',
+        'account_number': 'Account Number',
+        'activity': 'Activity',
+        'description': 'Description',
+        'symbol': 'Symbol',
+        'quantity': 'Quantity',
+        'amount': 'Amount',
+        'notes': 'Notes',
+    }
+
+    readers = {
+        'xlsx': XlsxStockReader,
+        'csv': CsvStockReader,
+    }
+
+    def __init__(self, file, spill_threshold: int | None = None, extension: str | None = None):
+        extension = (extension or os.path.splitext(file.name)[1]).lstrip('.').lower()
+        if extension not in self.readers:
+            raise ValueError(f"Unsupported file type: {extension}")
+        self.reader = self.readers[extension](file)
+        self.spill_threshold = spill_threshold or settings.IMPORT_SPILL_THRESHOLD
+        self.buffer = tempfile.SpooledTemporaryFile(max_size=self.spill_threshold)
+        self.oldest: dict[str, StockRow] = {}
+        self.errors: list[RowError] = []
+        self.total_rows = 0
+        self.__read()
 
     def create_iter(self):
-        rows = self.ws.iter_rows(values_only=True)
-        headers = next(rows)    
+        rows = self.reader.rows()
+        headers = next(rows)
         header_idx = {h: i for i, h in enumerate(headers)}
         return rows, header_idx
 
-    def oldest_symbols(self):
-        rows, header_idx = self.create_iter()
-        by_symbol = {}
-        for row in rows:
-            symbol = row[header_idx['Symbol']]
-            trade_date = row[header_idx['Trade Date']]
-
-            if (
-                symbol is None 
-                or str(symbol).strip()=='' 
-                or row[header_idx['Quantity']] is None 
-                or row[header_idx['Amount']] is None 
-                or trade_date is None
-            ):
-                continue
+    @staticmethod
+    def to_decimal(value) -> Decimal:
+        if isinstance(value, Decimal):
+            return value
+        try:
+            return Decimal(str(value).strip().replace(',', ''))
+        except InvalidOperation:
+            raise ValueError(f"'{value}' is not a valid number")
 
-            if symbol not in by_symbol:
-                by_symbol[symbol] = row
-                continue
+    @classmethod
+    def to_quantity(cls, value) -> int | Decimal:
+        quantity = cls.to_decimal(value)
+        if quantity == quantity.to_integral_value():
+            return int(quantity)
+        return quantity
 
-            current = by_symbol[symbol]
-            if trade_date < current[header_idx['Trade Date']]:
-                by_symbol[symbol] = row
-        return by_symbol
+    @staticmethod
+    def to_date(value) -> datetime.date:
+        if isinstance(value, datetime.datetime):
+            return value.date()
+        if isinstance(value, datetime.date):
+            return value
+        try:
+            return date_parser.parse(str(value).strip()).date()
+        except (ValueError, OverflowError):
+            raise ValueError(f"'{value}' is not a valid date")
 
-    def rows_by_symbols(self, symbols):
+    @staticmethod
+    def to_text(value) -> str | None:
+        if value is None:
+            return None
+        value = str(value).strip()
+        return value or None
+
+    def __parse(self, row_number, row, header_idx) -> StockRow:
+        values = {
+            field: row[header_idx[column]] if header_idx[column] < len(row) else None
+            for field, column in self.columns.items()
+        }
+        missing = [
+            self.columns[field] for field in ('trade_date', 'quantity', 'amount')
+            if values[field] is None or str(values[field]).strip() == ''
+        ]
+        if missing:
+            raise ValueError(f"Missing value for {', '.join(missing)}")
+        quantity = self.to_quantity(values['quantity'])
+        if quantity == 0:
+            raise ValueError("Quantity cannot be zero")
+        return StockRow(
+            row_number=row_number,
+            data_for=self.to_text(values['data_for']),
+            trade_date=self.to_date(values['trade_date']),
+            account=self.to_text(values['account']),
+            account_name=self.to_text(values['account_name']),
+            account_type=self.to_text(values['account_type']),
+            account_number=self.to_text(values['account_number']),
+            activity=self.to_text(values['activity']),
+            description=self.to_text(values['description']),
+            symbol=str(values['symbol']).strip(),
+            quantity=quantity,
+            amount=self.to_decimal(values['amount']),
+            notes=self.to_text(values['notes']),
+        )
+
+    def __read(self):
         rows, header_idx = self.create_iter()
-        symbols = {str(s).strip() for s in symbols} 
-        for row in rows:
-            symbol = row[header_idx["Symbol"]]
-            if symbol is None:
+        missing = [c for c in self.columns.values() if c not in header_idx]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+        symbol_idx = header_idx['Symbol']
+        for row_number, row in enumerate(rows, start=2):
+            symbol = row[symbol_idx] if symbol_idx < len(row) else None
+            if symbol is None or str(symbol).strip() == '':
                 continue
-            symbol = str(symbol).strip()
-            if symbol not in symbols:
+            self.total_rows += 1
+            try:
+                stock_row = self.__parse(row_number, row, header_idx)
+            except Exception as e:
+                self.errors.append(RowError(row_number, str(e), list(row)))
                 continue
-            yield row
+            current = self.oldest.get(stock_row.symbol)
+            if current is None or stock_row.trade_date < current.trade_date:
+                self.oldest[stock_row.symbol] = stock_row
+            pickle.dump(tuple(stock_row), self.buffer, protocol=pickle.HIGHEST_PROTOCOL)
+        self.reader.close()
+
+    def oldest_symbols(self) -> dict[str, StockRow]:
+        return self.oldest
 
+    def rows(self) -> Iterator[StockRow]:
+        self.buffer.seek(0)
+        while True:
+            try:
+                yield StockRow(*pickle.load(self.buffer))
+            except EOFError:
+                return
 
+    def rows_by_symbols(self, symbols) -> Iterator[StockRow]:
+        symbols = {str(s).strip() for s in symbols}
+        for row in self.rows():
+            if row.symbol in symbols:
+                yield row
 
+    def close(self):
+        self.buffer.close()
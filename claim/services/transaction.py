@@ -3,12 +3,16 @@ import datetime
 from decimal import Decimal
 import decimal
 import re
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from archeota import settings
 from django.db import transaction
 from django.forms import model_to_dict
 from claim.models import ClaimActionTransaction
 from collections import defaultdict
-from django.db.models import Q
 from claim.services.holdings import HoldingService
+from claim.services import workers as workers_svc
 
 class TransactionService():
     def __init__(self, user, company_profile):
@@ -19,6 +23,7 @@ class TransactionService():
         self.actions_saved: list[ClaimActionTransaction] = []
         self.buy_activities = ['BUY', 'INCOME']
         self.sell_activities = ['SELL']
+        self.buy_codes = [ClaimActionTransaction.ActivityChoices.BUY, ClaimActionTransaction.ActivityChoices.INCOME]
         self.holding_svc = HoldingService(self.user)
 
     def is_buy_activity(self, activity: str) -> bool:
@@ -38,26 +43,44 @@ class TransactionService():
 
     @transaction.atomic
     def validate_oldest_buy(self, symbol, activity_row) -> bool:
-        qs = (ClaimActionTransaction.objects
-                .filter(user=self.user, symbol=symbol))
-        q_filter = Q()
-        for act in self.buy_activities:
-            if '.*' in act:
-                q_filter |= Q(activity__iregex=act)
-            else:
-                q_filter |= Q(activity__icontains=act)
-        oldest = qs.filter(q_filter).order_by('trade_date', 'id').first()
+        oldest = (ClaimActionTransaction.objects
+                .filter(user=self.user, symbol=symbol, activity_code__in=self.buy_codes)
+                .order_by('trade_date', 'id')
+                .first())
         return not ((
             activity_row is None
             or str(activity_row).strip().upper() in self.sell_activities
         ) and not oldest)
 
+    def symbols_with_buy(self, symbols) -> set[str]:
+        if not symbols:
+            return set()
+        return set(
+            ClaimActionTransaction.objects
+            .filter(user=self.user, symbol__in=list(symbols), activity_code__in=self.buy_codes)
+            .values_list('symbol', flat=True)
+            .distinct()
+        )
+
+    def validate_oldest_buys(self, activities_by_symbol: dict) -> set[str]:
+        """
+        Bulk ``validate_oldest_buy``: returns the symbols whose oldest row is a
+        sell (or has no activity) and that have no previous buy, in one query.
+        """
+        starts_with_sell = {
+            symbol for symbol, activity in activities_by_symbol.items()
+            if activity is None or str(activity).strip().upper() in self.sell_activities
+        }
+        return starts_with_sell - self.symbols_with_buy(starts_with_sell)
+
     @transaction.atomic
     def insert_objects(self, bulk):
         ClaimActionTransaction.objects.bulk_create(bulk)
         self.actions_saved.extend(bulk)
     
     def create_instance(self, data_for, trade_date, account, account_name, account_type, account_number, activity, description, symbol, quantity, cost_per_stock, amount, notes):
+        if isinstance(trade_date, datetime.datetime):
+            trade_date = trade_date.date()
         return ClaimActionTransaction(
             data_for=data_for,
             trade_date=trade_date,
@@ -66,6 +89,7 @@ class TransactionService():
             account_type=account_type,
             account_number=account_number,
             activity=activity,
+            activity_code=ClaimActionTransaction.ActivityChoices.normalize(activity),
             description=description,
             symbol=symbol,
             quantity=quantity,
@@ -94,16 +118,16 @@ class TransactionService():
     def __group_symbols(self, actions: list[ClaimActionTransaction]) -> list[ClaimActionTransaction]: 
         group_dates = defaultdict(list[ClaimActionTransaction])
         for action in actions:
-            group_dates[action.trade_date.date()].append(action)
+            group_dates[action.trade_date].append(action)
         # Create summarize
-        result: defaultdict[datetime.datetime, list[ClaimActionTransaction]] = defaultdict(list[ClaimActionTransaction])
+        result: defaultdict[datetime.date, list[ClaimActionTransaction]] = defaultdict(list[ClaimActionTransaction])
         for trade_date, claims in group_dates.items():
             groups: defaultdict[tuple[str, Decimal], ClaimActionTransaction] = {}
             for claim in claims:
                 if claim.activity is None or claim.cost_per_stock is None:
                     continue
                 activity = str(claim.activity).strip().upper()
-                cost_per_stock = (claim.cost_per_stock / Decimal('0.01')).to_integral_value() * Decimal('0.001')
+                cost_per_stock = self.__round_cost(claim.cost_per_stock)
                 compare_keys = (activity, cost_per_stock)
                 if compare_keys not in groups:
                     groups[compare_keys] = self.create_instance(
@@ -128,26 +152,115 @@ class TransactionService():
             result[trade_date] = list(groups.values())
         return result
 
-    def __process_group(self, claims_by_dates: defaultdict[datetime.datetime, list[ClaimActionTransaction]]):
+    @staticmethod
+    def __round_cost(cost_per_stock: Decimal) -> Decimal:
+        return (cost_per_stock / Decimal('0.01')).to_integral_value() * Decimal('0.001')
+
+    def __aggregate_frame(self) -> dict[str, dict[datetime.date, list[ClaimActionTransaction]]]:
+        """
+        Vectorized equivalent of ``__order_actions`` + ``__group_symbols``:
+        rows are sorted and summed per (symbol, date, activity, rounded cost)
+        with a single pandas groupby, keeping the same group order.
+        """
+        frame = pd.DataFrame({
+            'position': range(len(self.actions_saved)),
+            'symbol': [o.symbol for o in self.actions_saved],
+            'trade_date': [o.trade_date for o in self.actions_saved],
+            'activity': [o.activity for o in self.actions_saved],
+            'cost_per_stock': [o.cost_per_stock for o in self.actions_saved],
+            'quantity': [o.quantity for o in self.actions_saved],
+            'amount': [o.amount for o in self.actions_saved],
+        })
+        frame = frame[frame['symbol'].notna() & frame['trade_date'].notna()]
+        frame = frame.assign(symbol_key=frame['symbol'].astype(str))
+        frame = frame.sort_values(['symbol_key', 'trade_date'], kind='mergesort')
+        result: dict[str, dict[datetime.date, list[ClaimActionTransaction]]] = {
+            symbol: defaultdict(list) for symbol in frame['symbol'].unique()
+        }
+        frame = frame[frame['activity'].notna() & frame['cost_per_stock'].notna()]
+        if frame.empty:
+            return result
+        codes, uniques = pd.factorize(frame['cost_per_stock'])
+        rounded = [self.__round_cost(cost) for cost in uniques]
+        frame = frame.assign(
+            activity_key=frame['activity'].astype(str).str.strip().str.upper(),
+            cost_key=[rounded[code] for code in codes],
+        )
+        aggregated = (
+            frame
+            .groupby(['symbol', 'trade_date', 'activity_key', 'cost_key'], sort=False)
+            .agg(position=('position', 'first'), quantity=('quantity', 'sum'), amount=('amount', 'sum'))
+        )
+        for (symbol, trade_date, _, _), position, quantity, amount in zip(
+            aggregated.index, aggregated['position'], aggregated['quantity'], aggregated['amount']
+        ):
+            claim = self.actions_saved[position]
+            result[symbol][trade_date].append(self.create_instance(
+                data_for=claim.data_for,
+                trade_date=claim.trade_date,
+                account=claim.account,
+                account_name=claim.account_name,
+                account_type=claim.account_type,
+                account_number=claim.account_number,
+                activity=claim.activity,
+                description=claim.description,
+                symbol=claim.symbol,
+                quantity=quantity,
+                cost_per_stock=claim.cost_per_stock,
+                amount=amount,
+                notes=claim.notes,
+            ))
+        return result
+
+    def process_symbol(self, symbol, claims_by_dates: defaultdict[datetime.date, list[ClaimActionTransaction]]):
         warnings = {}
+        engine = self.holding_svc.lot_engine(symbol)
+        engine.reserve(sum(
+            1 for claims in claims_by_dates.values() for claim in claims
+            if self.is_buy_activity(claim.activity)
+        ))
         for _, claims in claims_by_dates.items():
             for claim in claims:
                 try:
                     if self.is_buy_activity(claim.activity):
-                        self.holding_svc.buy_activity(claim)
+                        engine.buy(claim)
                     elif self.is_sell_activity(claim.activity):
-                        self.holding_svc.sell_activity(claim)
+                        engine.sell(claim)
                 except Exception as e:
                     warnings[claim.symbol] = str(e)
+        engine.flush()
         return warnings
         
 
-    def process_bulk(self):
+    def grouped_actions(self, vectorized: bool | None = None):
+        if vectorized is None:
+            vectorized = len(self.actions_saved) >= settings.IMPORT_VECTORIZED_MIN_ROWS
+        if vectorized:
+            return self.__aggregate_frame()
+        return {
+            symbol: self.__group_symbols(actions)
+            for symbol, actions in self.__order_actions().items()
+        }
+
+    def __process_parallel(self, grouped, workers: int) -> list[dict]:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(grouped)), mp_context=context, initializer=workers_svc.init_worker) as pool:
+            return list(pool.map(
+                workers_svc.process_symbol,
+                [self.user.pk] * len(grouped),
+                grouped.keys(),
+                [dict(group) for group in grouped.values()]
+            ))
+
+    def process_bulk(self, vectorized: bool | None = None, workers: int | None = None):
         warnings = []
-        symbol_ordered = self.__order_actions()
-        for __symbol, actions in symbol_ordered.items():
-            group = self.__group_symbols(actions)
-            warns = self.__process_group(group)
-            warnings.append(warns)
+        grouped = self.grouped_actions(vectorized)
+        workers = workers or settings.HOLDINGS_WORKERS
+        if workers > 1 and len(grouped) > 1:
+            warnings = self.__process_parallel(grouped, workers)
+        else:
+            for symbol, group in grouped.items():
+                warns = self.process_symbol(symbol, group)
+                warnings.append(warns)
         self.actions_saved.clear()
         return warnings
@@ -0,0 +1,19 @@
+import os
+
+
+def init_worker():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'archeota.settings')
+    import django
+    django.setup()
+
+
+def process_symbol(user_pk, symbol, claims_by_dates):
+    """
+    Runs in a pool worker with its own DB connection; the lot engine flush
+    is the per-symbol transaction.
+    """
+    from django.contrib.auth import get_user_model
+    from claim.services.transaction import TransactionService
+    user = get_user_model().objects.select_related('profile__company').get(pk=user_pk)
+    svc = TransactionService(user=user, company_profile=user.profile.company)
+    return svc.process_symbol(symbol, claims_by_dates)
@@ -2,10 +2,13 @@ from django.urls import path
 from .views import (
     ClaimActionDetailsView,
     ClaimActionGenerateClaimView,
+    ClaimActionPreviewView,
+    ClaimJobDetailView,
     ClaimActionListView,
     ClaimActionTransactionListView,
 
     ImportTransactionsDataView,
+    ImportJobDetailView,
     ImportLogListView,
     UserImportJobsView,
     ClaimActionDashboardView,
@@ -21,6 +24,8 @@ urlpatterns = [
     path('class-actions/<int:pk>', ClassActionLawsuitDetailView.as_view(), name='classactions-detail'),
     path('claim-actions/', ClaimActionListView.as_view(), name='claimaction-list'),
     path('claim-actions/generate-claim/<int:pk>/', ClaimActionGenerateClaimView.as_view(), name='generate-claim'),
+    path('claim-actions/preview/<int:pk>/', ClaimActionPreviewView.as_view(), name='preview-claim'),
+    path('claim-jobs/<uuid:job_id>/', ClaimJobDetailView.as_view(), name='claim-job-detail'),
     path('claim-actions/details/<int:pk>/', ClaimActionDetailsView.as_view(), name='detail-claim'),
     path('claim-actions/<int:pk>/', ClaimActionDetailView.as_view(), name='claimaction-detail'), # <-- AÑADIR ESTA LÍNEA
     path('claim-actions/dashboard/', ClaimActionDashboardView.as_view(), name='claimaction-dashboard'),
@@ -28,6 +33,7 @@ urlpatterns = [
     path('claim-transactions/', ClaimActionTransactionListView.as_view(), name='claimtransaction-list-create'),
     path('claim-transactions/<int:pk>/', ClaimActionTransactionDetailView.as_view(), name='claimtransaction-detail'),
     path('transactions/import-data/', ImportTransactionsDataView.as_view(), name='import-transaction-data'),
+    path('import-jobs/<uuid:job_id>/', ImportJobDetailView.as_view(), name='import-job-detail'),
     path('import-logs/<uuid:job_id>/', ImportLogListView.as_view(), name='import-log-list'),
     path('my-imports/', UserImportJobsView.as_view(), name='user-import-jobs'),
 ]
@@ -1,30 +1,32 @@
 from decimal import Decimal
 from django.forms import ValidationError
 from rest_framework.response import Response
-import uuid
-from datetime import datetime
 from rest_framework.views import APIView
 from django.db import transaction
 import pandas as pd
 from asset.pagination import StandardResultsSetPagination
-from claim.services.stock import FileStockHandler
+from archeota.jobs import BackgroundJobs
+from claim.services.importer import ImportService
 from claim.services.transaction import TransactionService
 from users.models import Company
-from .models import ClaimActionTransaction, ClaimAction, ImportLog, ClassActionLawsuit
+from .models import ClaimActionTransaction, ClaimAction, ClaimJob, ImportJob, ImportLog, ClassActionLawsuit
 from rest_framework import status, generics, permissions
 from .serializers import (
     ClaimActionSerializer,
     FileUploadSerializer,
     ClaimActionTransactionSerializer,
+    ClaimJobSerializer,
+    ImportJobSerializer,
     ImportLogSerializer,
     ErrorLogDetailSerializer,
     ClassActionLawsuitSerializer
 )
 from claim.services.claim import ClaimSevice
+from claim.services.preview import ClaimPreviewService
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.contrib.auth import get_user_model
 from django.db.models import Count, Q
-from users.permissions import IsCompanyManager
+from users.permissions import IsCatalogManager, IsCompanyManager
 from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 # Added for dashboard aggregation of assets
 from asset.models import Asset
@@ -172,14 +174,58 @@ class ClaimActionGenerateClaimView(generics.RetrieveAPIView):
         claim_action = self.get_object()
         if not claim_action.company:
             return Response('Company does not exist in claim action', status=status.HTTP_400_BAD_REQUEST)
-        if claim_action.claimed:
+        failed = claim_action.class_actions_lawsuits.filter(
+            delivery_status=ClassActionLawsuit.DeliveryStatusChoices.FAILED
+        ).exists()
+        if claim_action.claimed and not failed:
             return Response('This action is already claimed', status=status.HTTP_400_BAD_REQUEST)
 
         svc = ClaimSevice(self.request.user, claim_action.company)
-        svc.process_claim(claim_action)
-        claim_action.claimed = True
-        claim_action.save(update_fields=["claimed"])
-        return Response()
+        if not svc.can_process():
+            return Response('Not allowed', status=status.HTTP_403_FORBIDDEN)
+        active = claim_action.claim_jobs.filter(
+            status__in=[ClaimJob.StatusChoices.PENDING, ClaimJob.StatusChoices.RUNNING]
+        ).first()
+        if active:
+            return Response({
+                'message': 'This action is already being claimed',
+                'claim_job_id': active.claim_job_id,
+                'status': active.status
+            }, status=status.HTTP_409_CONFLICT)
+
+        job = ClaimJob.objects.create(
+            claim=claim_action,
+            company=claim_action.company,
+            requested_by=self.request.user
+        )
+        transaction.on_commit(lambda: BackgroundJobs.submit(ClaimSevice.run_job, job.pk))
+        return Response({
+            'message': 'Claim accepted for processing',
+            'claim_job_id': job.claim_job_id,
+            'status': job.status
+        }, status=status.HTTP_202_ACCEPTED)
+
+class ClaimActionPreviewView(generics.RetrieveAPIView):
+    serializer_class = ClaimActionSerializer
+    permission_classes = [permissions.IsAuthenticated, IsCatalogManager]
+    throttle_classes = [UserRateThrottle]
+
+    def get_queryset(self):
+        user = self.request.user
+        qs = ClaimAction.objects.select_related("company")
+
+        if user.role != 'SUPER_ADMIN':
+            qs = qs.filter(company=user.profile.company)
+        return qs
+
+    def get(self, request, *args, **kwargs):
+        claim_action = self.get_object()
+        if not claim_action.company:
+            return Response('Company does not exist in claim action', status=status.HTTP_400_BAD_REQUEST)
+        if not claim_action.start_eligibility_date or not claim_action.final_eligibility_date:
+            return Response('Claim action has no eligibility dates', status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(ClaimPreviewService(claim_action).preview())
 
 class ClaimActionTransactionListView(generics.ListCreateAPIView):
     serializer_class = ClaimActionTransactionSerializer
@@ -242,7 +288,7 @@ class ClaimActionTransactionListView(generics.ListCreateAPIView):
             description=data['description'],
             notes=data['notes'],
             symbol=data['symbol'],
-            trade_date=datetime.fromisoformat(data['trade_date'])
+            trade_date=data['trade_date']
         )
         transaction_svc.insert_objects([instance])
         transaction_svc.process_bulk()
@@ -296,7 +342,6 @@ class ImportTransactionsDataView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         file_obj = serializer.validated_data['file']
-        current_job_id = uuid.uuid4()
         target_user_id = serializer.validated_data.get('target_user_id')
         user_for_import = None
 
@@ -306,70 +351,46 @@ class ImportTransactionsDataView(APIView):
             # Comportamiento por defecto: usar el usuario de la sesión.
             user_for_import = request.user
 
-        successful_imports = 0
-        failed_imports = 0
-        warnings_imports = {}
-        company_profile = user_for_import.profile.company
-        try:
-            transaction_svc = TransactionService(user=user_for_import, company_profile=company_profile)
-            file_svc = FileStockHandler(file_obj)
-            _, header_idx = file_svc.create_iter()
-            batch_size = 1000
-            objects = []
-            oldest_symbols = file_svc.oldest_symbols()
-            symbols = []
-            for symbol in oldest_symbols:
-                old_activity_row = oldest_symbols[symbol][header_idx["Activity"]]
-                validated = transaction_svc.validate_oldest_buy(symbol, old_activity_row)
-                if not validated:
-                    warnings_imports[symbol] = "There is no initial purchase for this symbol"
-                    continue
-                symbols.append(symbol)
-
-            for row in file_svc.rows_by_symbols(symbols):
-                try:
-                    cost_per_stock = Decimal(row[header_idx['Amount']]) / Decimal(row[header_idx['Quantity']])
-                    obj = transaction_svc.create_instance(
-                        data_for=row[header_idx['Data For']],
-                        trade_date=row[header_idx['Trade Date']],
-                        account=row[header_idx['Account']],
-                        account_name=row[header_idx['Account Name']],
-                        account_type=row[header_idx['Account Type']],
-                        account_number=row[header_idx['Account Number']],
-                        activity=row[header_idx['Activity']],
-                        description=row[header_idx['Description']],
-                        symbol=row[header_idx['Symbol']],
-                        quantity=row[header_idx['Quantity']],
-                        cost_per_stock=cost_per_stock,
-                        amount=row[header_idx['Amount']],
-                        notes=row[header_idx['Notes']]
-                    )
-                    objects.append(obj)
-                    if len(objects) >= batch_size:
-                        transaction_svc.insert_objects(objects)
-                        successful_imports += len(objects)
-                        objects.clear()
-
-                except Exception as e:
-                    failed_imports += 1   
-
-            if objects:
-                transaction_svc.insert_objects(objects)
-                successful_imports += len(objects)
-                objects.clear()
-
-            warnings_process = transaction_svc.process_bulk()
+        job = ImportJob.objects.create(
+            file=file_obj,
+            user=user_for_import,
+            requested_by=request.user
+        )
+        transaction.on_commit(lambda: BackgroundJobs.submit(ImportService.run_job, job.pk))
 
-            return Response({
-                "message": "Processing complete.",
-                "import_job_id": current_job_id,
-                "successful_imports": successful_imports,
-                "failed_imports": failed_imports,
-                "warnings_imports": warnings_imports,
-                "warnings_process": warnings_process
-            }, status=status.HTTP_202_ACCEPTED)
-        except Exception as e:
-            return Response({'error': f"Error processing file: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({
+            "message": "Processing started.",
+            "import_job_id": job.import_job_id,
+            "status": job.status
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class ImportJobDetailView(generics.RetrieveAPIView):
+    serializer_class = ImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [UserRateThrottle]
+    lookup_field = 'import_job_id'
+    lookup_url_kwarg = 'job_id'
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role == 'SUPER_ADMIN':
+            return ImportJob.objects.all()
+        return ImportJob.objects.filter(Q(user=user) | Q(requested_by=user))
+
+
+class ClaimJobDetailView(generics.RetrieveAPIView):
+    serializer_class = ClaimJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [UserRateThrottle]
+    lookup_field = 'claim_job_id'
+    lookup_url_kwarg = 'job_id'
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role == 'SUPER_ADMIN':
+            return ClaimJob.objects.all()
+        return ClaimJob.objects.filter(company=user.profile.company)
 
 
 class ImportLogListView(generics.ListAPIView):
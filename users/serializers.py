@@ -4,7 +4,8 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer as SimpleJWTTokenObtainPairSerializer
 from .models import Profile, Company, CompanyProfile, Role, Classification, Country
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
+from archeota.mail import MailDispatcher
 from django.conf import settings
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
@@ -151,13 +152,14 @@ class UserSerializer(serializers.ModelSerializer):
                 'Archeota App Team.'
             )
 
-            send_mail(
+            result = MailDispatcher.send_one(EmailMessage(
                 subject,
                 message,
                 settings.DEFAULT_FROM_EMAIL,
                 [user.email],
-                fail_silently=False,
-            )
+            ))
+            if not result.sent:
+                raise Exception(result.error)
         except Exception as e:
             print(f"Error al enviar correo a {user.email}: {e}")
 
@@ -1007,13 +1009,14 @@ class ExternalRegisterSerializer(serializers.ModelSerializer):
                 'Archeota App Team.'
             )
 
-            send_mail(
+            result = MailDispatcher.send_one(EmailMessage(
                 subject,
                 message,
                 settings.DEFAULT_FROM_EMAIL,
                 [user.email],
-                fail_silently=False,
-            )
+            ))
+            if not result.sent:
+                raise Exception(result.error)
         except Exception as e:
             print(f"Error al enviar correo a {user.email}: {e}")
 
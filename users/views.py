@@ -38,7 +38,8 @@ import requests as rq
 from django.db.models import Q, Count
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
+from archeota.mail import MailDispatcher
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
@@ -551,10 +552,9 @@ class ForgotMyPassword(APIView):
             "The link will expire in 1 hour.\n\n"
             "Thank You."
         )
-        try:
-            send_mail(subject, message, settings.ADMIN_USER_EMAIL, [user.email])
-        except Exception as e:
-            print(f"Error sending email: {e}")
+        result = MailDispatcher.send_one(EmailMessage(subject, message, settings.ADMIN_USER_EMAIL, [user.email]))
+        if not result.sent:
+            print(f"Error sending email: {result.error}")
             return Response({'error': 'There was a problem sending the email.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         return Response({'detail': 'If an account exists with this email, reset instructions will be sent.'}, status=status.HTTP_200_OK)    